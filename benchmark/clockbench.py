@@ -0,0 +1,103 @@
+# Wakeups and CPU of the playback loop alone (no decoding or painting) while "playing" a clip at fps.
+#   poll     : the old ElapsedTimer, a 1 ms QTimer reading datetime.now() on every tick, draw on every tick
+#   deadline : PlaybackClock with a DeadlineTimer woken at the next frame's due time
+# late is how far past its due time each new frame was picked up.
+# --resumes replays the old start() reconnecting increment on every pause and resume.
+# python benchmark/clockbench.py [--fps 24] [--seconds 5] [--resumes 0]
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")))
+from PySide2.QtCore import QCoreApplication, QTimer
+
+from component.PlaybackClock import DeadlineTimer, PlaybackClock
+
+class Loop(object):
+    def __init__(self, mode, fps, resumes):
+        self.mode = mode
+        self.fps = fps
+        self.frame = -1
+        self.frames = 0
+        self.wakeups = 0
+        self.late = []
+        if mode == "poll":
+            self.timer = QTimer()
+            self.timer.setInterval(1)
+            for i in range(resumes + 1):
+                self.timer.timeout.connect(self.increment)
+            self.timer.timeout.connect(self.draw)
+        else:
+            self.clock = PlaybackClock()
+            self.timer = DeadlineTimer(self.clock)
+            self.timer.timeout.connect(self.draw)
+
+    def increment(self):
+        self.elapsed = datetime.now() - self.startTime
+
+    def now(self):
+        if self.mode == "poll":
+            return self.elapsed.total_seconds()
+        return self.clock.time()
+
+    def start(self):
+        if self.mode == "poll":
+            self.startTime = datetime.now()
+            self.elapsed = datetime.now() - self.startTime
+            self.timer.start()
+        else:
+            self.clock.start()
+            self.timer.start(0)
+
+    def draw(self):
+        self.wakeups += 1
+        now = self.now()
+        frame = int(now * self.fps)
+        if frame != self.frame:
+            self.frame = frame
+            self.frames += 1
+            self.late.append((now - frame / self.fps) * 1000)
+        if self.mode == "deadline":
+            self.timer.wakeAt((frame + 1) / self.fps)
+
+def run(mode, args):
+    loop = Loop(mode, args.fps, args.resumes)
+    stop = QTimer()
+    stop.setSingleShot(True)
+    stop.timeout.connect(QCoreApplication.quit)
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    loop.start()
+    stop.start(int(args.seconds * 1000))
+    QCoreApplication.exec_()
+    loop.timer.stop()
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    late = sorted(loop.late[1:]) or [0]
+    return {
+        "wakeups" : loop.wakeups / wall,
+        "frames" : loop.frames / wall,
+        "cpu" : cpu / wall * 100,
+        "lateMean" : sum(late) / len(late),
+        "lateMax" : late[-1],
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fps", type=float, default=24)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--resumes", type=int, default=0)
+    args = parser.parse_args()
+
+    app = QCoreApplication([])
+    for mode in ("poll", "deadline"):
+        r = run(mode, args)
+        print(
+            f"{mode:8} {r['wakeups']:7.1f} wakeups/s {r['frames']:5.1f} frames/s CPU {r['cpu']:5.1f}% "
+            f"late mean {r['lateMean']:5.2f} ms max {r['lateMax']:5.2f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
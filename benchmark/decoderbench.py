@@ -0,0 +1,74 @@
+# Startup and throughput of each DecoderOptions preset, decoding to rgb24 like VideoStream does.
+# python benchmark/decoderbench.py [--file 30.mp4] [--repeat 3]
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+root = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, root)
+import ffmpeg
+from component.DecoderOptions import PRESETS
+from component.PipeReader import FramePool, PipeReader
+
+def ffmpegCommand():
+    bundled = os.getenv("FFMPEG", "")
+    if os.path.isfile(bundled) and (os.name == "nt" or not bundled.endswith(".exe")):
+        return bundled
+    return shutil.which("ffmpeg") or "ffmpeg"
+
+def probeSize(cmd, file):
+    # Decode one frame to learn the size without needing ffprobe
+    out, _ = (
+        ffmpeg.input(file).output("pipe:", format="rawvideo", pix_fmt="rgb24", vframes=1)
+        .run(cmd=cmd, capture_stdout=True, capture_stderr=True)
+    )
+    err = subprocess.run([cmd, "-hide_banner", "-i", file], capture_output=True, text=True).stderr
+    for token in err.replace(",", " ").split():
+        if "x" in token and token.split("x")[0].isdigit() and token.split("x")[-1].isdigit():
+            width, height = (int(v) for v in token.split("x"))
+            if width * height * 3 == len(out):
+                return width, height
+    raise RuntimeError("Could not find the video size of {}".format(file))
+
+def measure(cmd, file, name, options, width, height):
+    args = (
+        ffmpeg.input(file, **options.inputArgs())
+        .output("pipe:", format="rawvideo", pix_fmt="rgb24", vsync="passthrough")
+        .compile(cmd=cmd)
+    )
+    start = time.perf_counter()
+    process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    reader = PipeReader(process.stdout)
+    pool = FramePool((height, width, 3), count=1)
+    frame = pool.acquire()
+    first = None
+    count = 0
+    while reader.readinto(frame):
+        if first is None:
+            first = time.perf_counter() - start
+        count += 1
+    if hasattr(os, "wait4"):
+        _, _, usage = os.wait4(process.pid, 0)
+        process.returncode = 0
+        rss = usage.ru_maxrss / 1024
+    else:
+        process.wait()
+        rss = float("nan")
+    elapsed = time.perf_counter() - start
+    first = float("nan") if first is None else first
+    print(f"{name:12s} first frame {first*1000:8.1f} ms  {count:5d} frames {elapsed:7.3f} s {count/elapsed:8.1f} fps  ffmpeg max rss {rss:7.1f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", default=os.path.join(root, "30.mp4"))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--preset", action="append", default=None)
+    args = parser.parse_args()
+    cmd = ffmpegCommand()
+    width, height = probeSize(cmd, args.file)
+    for i in range(args.repeat):
+        for name in args.preset or PRESETS:
+            measure(cmd, args.file, name, PRESETS[name], width, height)
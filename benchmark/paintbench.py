@@ -0,0 +1,86 @@
+# GUI thread cost per displayed frame for the Viewer display paths, painting into an offscreen
+# RGB32 image the way the raster backing store does.
+#   pixmap : QImage over the frame, QPixmap copy, drawPixmap (the old path)
+#   direct : QImage over the frame, drawImage without converting
+#   inline : QImage over the frame converted to RGB32 on the GUI thread, drawImage (Viewer fallback)
+#   ahead  : drawImage of an RGB32 QImage converted on the ImageQueue worker, worker time shown apart
+# python benchmark/paintbench.py [--width 1920 --height 1080] [--view 1280x720] [--file clip.mp4]
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PySide2.QtCore import QRect
+from PySide2.QtGui import QGuiApplication, QImage, QPainter, QPixmap
+
+from component.ImageQueue import ImageQueue
+
+def loadFrames(args):
+    if not args.file:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8) for i in range(args.frames)]
+    cmd = [
+        os.getenv("FFMPEG", "ffmpeg"), "-v", "error", "-i", args.file, "-frames:v", str(args.frames),
+        "-vf", f"scale={args.width}:{args.height}", "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:"
+    ]
+    raw = subprocess.run(cmd, stdout=subprocess.PIPE, check=True).stdout
+    return list(np.frombuffer(raw, np.uint8).reshape(-1, args.height, args.width, 3))
+
+def paint(target, rect, image):
+    painter = QPainter(target)
+    if isinstance(image, QPixmap):
+        painter.drawPixmap(rect, image)
+    else:
+        painter.drawImage(rect, image)
+    painter.end()
+
+def run(mode, frames, target, rect):
+    ahead = []
+    workerTime = 0
+    if mode == "ahead":
+        queue = ImageQueue()
+        for frame in frames:
+            start = time.perf_counter()
+            queue.convert(0, 0, frame, QImage.Format_RGB888)
+            workerTime += time.perf_counter() - start
+        ahead = [QImage(frame, frame.shape[1], frame.shape[0], frame.strides[0], QImage.Format_RGB888).convertToFormat(QImage.Format_RGB32) for frame in frames]
+    start = time.perf_counter()
+    for i, frame in enumerate(frames):
+        if mode == "ahead":
+            image = ahead[i]
+        else:
+            image = QImage(frame, frame.shape[1], frame.shape[0], frame.strides[0], QImage.Format_RGB888)
+            if mode == "pixmap":
+                image = QPixmap(image)
+            elif mode == "inline":
+                image = image.convertToFormat(QImage.Format_RGB32)
+        paint(target, rect, image)
+    elapsed = time.perf_counter() - start
+    return elapsed / len(frames) * 1000, workerTime / len(frames) * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--view", default="1280x720")
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--file")
+    args = parser.parse_args()
+
+    app = QGuiApplication([])
+    frames = loadFrames(args)
+    viewWidth, viewHeight = (int(v) for v in args.view.split("x"))
+    target = QImage(viewWidth, viewHeight, QImage.Format_RGB32)
+    rect = QRect(0, 0, viewWidth, viewHeight)
+    for mode in ("pixmap", "direct", "inline", "ahead"):
+        gui, worker = run(mode, frames, target, rect)
+        extra = f" + {worker:6.2f} ms on the worker" if worker else ""
+        print(f"{mode:6} {args.width}x{args.height} -> {args.view} GUI {gui:6.2f} ms/frame{extra}")
+
+if __name__ == "__main__":
+    main()
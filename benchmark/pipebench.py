@@ -0,0 +1,76 @@
+# Raw pipe throughput of the frame reader, old read()+frombuffer path against PipeReader+FramePool.
+# python benchmark/pipebench.py [--width 3840 --height 2160 --frames 240] [--file clip.mp4]
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")))
+from component.PipeReader import FramePool, PipeReader
+
+PRODUCER = (
+    "import os, sys\n"
+    "size, count = int(sys.argv[1]), int(sys.argv[2])\n"
+    "frame = memoryview(bytes(size))\n"
+    "for i in range(count):\n"
+    "    view = frame\n"
+    "    while view:\n"
+    "        view = view[os.write(1, view):]\n"
+)
+
+def spawn(args, width, height, frames):
+    if args.file:
+        cmd = [
+            os.getenv("FFMPEG", "ffmpeg"), "-v", "error", "-i", args.file,
+            "-frames:v", str(frames), "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:"
+        ]
+    else:
+        cmd = [sys.executable, "-c", PRODUCER, str(width * height * 3), str(frames)]
+    return subprocess.Popen(cmd, stdout=subprocess.PIPE)
+
+def readCopy(process, width, height):
+    packetSize = width * height * 3
+    count = 0
+    while True:
+        packet = process.stdout.read(packetSize)
+        if len(packet) < packetSize:
+            break
+        frame = np.frombuffer(packet, np.uint8).reshape([height, width, 3])
+        count += 1
+    return count
+
+def readPool(process, width, height):
+    pool = FramePool((height, width, 3))
+    reader = PipeReader(process.stdout)
+    count = 0
+    while True:
+        frame = pool.acquire()
+        if not reader.readinto(frame):
+            break
+        count += 1
+        pool.release(frame)
+    return count
+
+def measure(name, func, args):
+    process = spawn(args, args.width, args.height, args.frames)
+    start = time.perf_counter()
+    count = func(process, args.width, args.height)
+    elapsed = time.perf_counter() - start
+    process.wait()
+    mb = count * args.width * args.height * 3 / 1e6
+    print(f"{name:10s} {count:5d} frames {mb:9.1f} MB {elapsed:7.3f} s {mb/elapsed:9.1f} MB/s {count/elapsed:8.1f} fps")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--frames", type=int, default=240)
+    parser.add_argument("--file", default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for i in range(args.repeat):
+        measure("read", readCopy, args)
+        measure("readinto", readPool, args)
@@ -0,0 +1,89 @@
+# Paints per second of the Viewer paint path on a real widget under the offscreen platform, frames at
+# 1080p and 4K shown in a widget shrink times their size (the small shrinks Viewer keeps decoding at).
+#   old    : drawImage(rect(), frame) over the erased stylesheet background (the previous paintEvent)
+#   fast   : FrameRenderer while playing, a new frame every paint drawn with nearest scaling
+#   smooth : FrameRenderer while paused, a new frame every paint scaled smoothly
+#   cached : FrameRenderer repainting the same frame, expose or overlay repaints while paused
+# python benchmark/renderbench.py [--sizes 1920x1080,3840x2160] [--shrink 0.9] [--frames 30]
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PySide2.QtCore import Qt
+from PySide2.QtGui import QImage, QPainter
+from PySide2.QtWidgets import QApplication, QWidget
+
+from component.FrameRenderer import FrameRenderer
+
+class Surface(QWidget):
+    def __init__(self, mode, ratio):
+        super(Surface, self).__init__()
+        self.mode = mode
+        self.ratio = ratio
+        self.image = None
+        self.renderer = FrameRenderer()
+        self.setObjectName("Frame")
+        if mode == "old":
+            self.setAttribute(Qt.WA_StyledBackground)
+            self.setStyleSheet("#Frame {background-color:black;}")
+        else:
+            self.setAttribute(Qt.WA_OpaquePaintEvent)
+            self.setAttribute(Qt.WA_NoSystemBackground)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        if self.mode == "old":
+            painter.drawImage(self.rect(), self.image)
+        else:
+            self.renderer.paint(painter, event.region(), self.size(), self.ratio, self.image, smooth=self.mode != "fast")
+        painter.end()
+
+def makeFrames(width, height, count):
+    rng = np.random.default_rng(0)
+    frames = []
+    for i in range(count):
+        data = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        frames.append(QImage(data, width, height, data.strides[0], QImage.Format_RGB888).convertToFormat(QImage.Format_RGB32))
+    return frames
+
+def run(mode, frames, size, repeats):
+    width, height = size
+    surface = Surface(mode, frames[0].width() / frames[0].height())
+    surface.resize(width, height)
+    surface.show()
+    QApplication.processEvents()
+    paints = 0
+    start = time.perf_counter()
+    for i in range(repeats):
+        for frame in frames:
+            surface.image = frames[0] if mode == "cached" else frame
+            surface.repaint(surface.renderer.frameRect(surface.size(), surface.ratio) if mode != "old" else surface.rect())
+            paints += 1
+    elapsed = time.perf_counter() - start
+    surface.close()
+    return paints / elapsed, surface.renderer.scales
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1920x1080,3840x2160")
+    parser.add_argument("--shrink", type=float, default=0.9)
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--repeats", type=int, default=2)
+    args = parser.parse_args()
+
+    app = QApplication([])
+    for size in args.sizes.split(","):
+        width, height = (int(v) for v in size.split("x"))
+        frames = makeFrames(width, height, args.frames)
+        view = (int(width * args.shrink), int(height * args.shrink))
+        for mode in ("old", "fast", "smooth", "cached"):
+            rate, scales = run(mode, frames, view, args.repeats)
+            print(f"{mode:6} {width}x{height} -> {view[0]}x{view[1]} {rate:8.1f} paints/s {1000 / rate:7.2f} ms/paint, {scales} rescales")
+
+if __name__ == "__main__":
+    main()
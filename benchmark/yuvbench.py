@@ -0,0 +1,103 @@
+# rgb24 pipe transport against yuv420p pipe + YUVConverter on a worker pool.
+# Without --file only the conversion is measured on synthetic frames.
+# python benchmark/yuvbench.py [--width 1920 --height 1080] [--file clip.mp4 --frames 300]
+import argparse
+import os
+import subprocess
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")))
+from component.PipeReader import FramePool, PipeReader
+from component.YUV import YUVConverter, frameSize
+
+def convertOnly(args):
+    converter = YUVConverter("bt709")
+    source = np.random.default_rng(0).integers(0, 256, frameSize(args.width, args.height)).astype(np.uint8)
+    for workers in sorted({1, args.workers}):
+        executor = ThreadPoolExecutor(max_workers=workers)
+        outputs = [np.empty((args.height, args.width, 3), np.uint8) for i in range(workers)]
+        start = time.perf_counter()
+        jobs = [executor.submit(converter.convert, source, args.width, args.height, outputs[i % workers]) for i in range(args.frames)]
+        for job in jobs:
+            job.result()
+        elapsed = time.perf_counter() - start
+        print(f"convert  {workers} workers {args.width}x{args.height} {elapsed/args.frames*1000:7.2f} ms/frame {args.frames/elapsed:8.1f} fps")
+        executor.shutdown()
+    rgb = args.width * args.height * 3
+    yuv = frameSize(args.width, args.height)
+    print(f"pipe bytes/frame rgb24 {rgb} yuv420p {yuv} ({yuv/rgb:.0%})")
+
+def spawn(args, pix_fmt):
+    cmd = [
+        os.getenv("FFMPEG", "ffmpeg"), "-v", "error", "-i", args.file, "-frames:v", str(args.frames),
+        "-vf", f"scale={args.width}:{args.height}", "-f", "rawvideo", "-pix_fmt", pix_fmt, "pipe:"
+    ]
+    return subprocess.Popen(cmd, stdout=subprocess.PIPE)
+
+def endToEndRGB(args):
+    process = spawn(args, "rgb24")
+    pool = FramePool((args.height, args.width, 3))
+    reader = PipeReader(process.stdout)
+    count = 0
+    while True:
+        frame = pool.acquire()
+        if not reader.readinto(frame):
+            break
+        pool.release(frame)
+        count += 1
+    process.wait()
+    return count, reader.bytesRead
+
+def endToEndYUV(args):
+    process = spawn(args, "yuv420p")
+    converter = YUVConverter("bt709")
+    executor = ThreadPoolExecutor(max_workers=args.workers)
+    sources = FramePool((frameSize(args.width, args.height),), count=args.workers + 2)
+    frames = FramePool((args.height, args.width, 3), count=args.workers + 2)
+    reader = PipeReader(process.stdout)
+    pending = deque()
+    count = 0
+    def finish(item):
+        source, frame, job = item
+        job.result()
+        sources.release(source)
+        frames.release(frame)
+    while True:
+        source = sources.acquire()
+        if not reader.readinto(source):
+            break
+        frame = frames.acquire()
+        pending.append((source, frame, executor.submit(converter.convert, source, args.width, args.height, frame)))
+        count += 1
+        if len(pending) >= args.workers:
+            finish(pending.popleft())
+    while pending:
+        finish(pending.popleft())
+    process.wait()
+    executor.shutdown()
+    return count, reader.bytesRead
+
+def measure(name, func, args):
+    start = time.perf_counter()
+    count, size = func(args)
+    elapsed = time.perf_counter() - start
+    print(f"{name:8s} {count:5d} frames {elapsed:7.3f} s {count/elapsed:8.1f} fps pipe {size/1e6/elapsed:8.1f} MB/s {size/max(count, 1)/1e6:6.2f} MB/frame")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=max(1, min(4, os.cpu_count() or 1)))
+    parser.add_argument("--file", default=None)
+    args = parser.parse_args()
+    if args.file:
+        measure("rgb24", endToEndRGB, args)
+        measure("yuv420p", endToEndYUV, args)
+    else:
+        convertOnly(args)
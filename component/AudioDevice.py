@@ -0,0 +1,128 @@
+import threading
+import time
+
+from PySide2.QtCore import QIODevice, QObject, Qt, QThread, Signal
+from PySide2.QtMultimedia import QAudio, QAudioOutput
+
+from component.AudioSource import AudioSource
+
+class AudioDevice(QObject):
+    # QAudioOutput and the AudioSource it pulls from, living on a thread of their own. The Qt5 backends
+    # call readData from a timer or queued callback on the thread that owns the output, so on the GUI
+    # thread delivery would wait behind every paint and decoder wakeup there.
+    # Commands are signals queued to that thread, stop blocks until the output has stopped so the source
+    # can be seeked right after. What the GUI reads back (state, processed time, bytes held by the
+    # device) is a snapshot the device thread takes on every notify and state change.
+    # finished is emitted once the output has played out the end of the source, not when it was read
+    stateChanged = Signal(int, int)
+    finished = Signal()
+    startRequested = Signal(int)
+    stopRequested = Signal()
+    suspendRequested = Signal()
+    resumeRequested = Signal()
+    closeRequested = Signal()
+    volumeRequested = Signal(float)
+
+    def __init__(self, audioFormat, stream, notifyInterval=10):
+        super(AudioDevice, self).__init__()
+        self.audioFormat = audioFormat
+        self.notifyInterval = notifyInterval
+        self.output = None
+        self.source = AudioSource(stream, parent=self)
+        self.source.finished.connect(self.sourceFinished)
+        self.ending = False
+        self.lock = threading.Lock()
+        # (state, processedUSecs, bytes held, perf_counter_ns)
+        self.snapshot = (QAudio.StoppedState, 0, 0, time.perf_counter_ns())
+
+        self.thread = QThread()
+        self.thread.setObjectName("AudioDevice")
+        self.moveToThread(self.thread)
+        self.thread.started.connect(self.createOutput)
+        self.startRequested.connect(self.startOutput)
+        self.stopRequested.connect(self.stopOutput, Qt.BlockingQueuedConnection)
+        self.suspendRequested.connect(self.suspendOutput)
+        self.resumeRequested.connect(self.resumeOutput)
+        self.closeRequested.connect(self.closeOutput, Qt.BlockingQueuedConnection)
+        self.volumeRequested.connect(self.source.setVolume)
+        self.thread.start(QThread.TimeCriticalPriority)
+
+    # GUI thread
+
+    def start(self, bufferSize):
+        self.startRequested.emit(bufferSize)
+
+    def stop(self):
+        self.stopRequested.emit()
+
+    def suspend(self):
+        self.suspendRequested.emit()
+
+    def resume(self):
+        self.resumeRequested.emit()
+
+    def setVolume(self, volume):
+        self.volumeRequested.emit(volume)
+
+    def close(self):
+        if not self.thread.isRunning(): return
+        self.closeRequested.emit()
+        self.thread.quit()
+        self.thread.wait()
+
+    def status(self):
+        with self.lock:
+            return self.snapshot
+
+    def state(self):
+        return self.status()[0]
+
+    # Device thread
+
+    def createOutput(self):
+        self.output = QAudioOutput(self.audioFormat)
+        self.output.setNotifyInterval(self.notifyInterval)
+        self.output.notify.connect(self.sample)
+        self.output.stateChanged.connect(self.outputStateChanged)
+        self.source.open(QIODevice.ReadOnly)
+
+    def sample(self):
+        output = self.output
+        snapshot = (output.state(), output.processedUSecs(), max(0, output.bufferSize() - output.bytesFree()), time.perf_counter_ns())
+        with self.lock:
+            self.snapshot = snapshot
+
+    def sourceFinished(self):
+        self.ending = True
+
+    def outputStateChanged(self, state):
+        self.sample()
+        self.stateChanged.emit(state, self.output.error())
+        if state == QAudio.IdleState and self.ending:
+            self.ending = False
+            self.finished.emit()
+
+    def startOutput(self, bufferSize):
+        self.ending = False
+        self.output.stop()
+        self.output.setBufferSize(bufferSize)
+        self.output.start(self.source)
+        self.sample()
+
+    def stopOutput(self):
+        self.output.stop()
+        self.sample()
+
+    def suspendOutput(self):
+        self.output.suspend()
+        self.sample()
+
+    def resumeOutput(self):
+        self.output.resume()
+        self.sample()
+
+    def closeOutput(self):
+        self.output.stop()
+        self.source.close()
+        # Deleted here, on the thread that owns it
+        self.output = None
@@ -0,0 +1,99 @@
+import threading
+
+import numpy as np
+from PySide2.QtCore import QIODevice, Signal
+
+class AudioSource(QIODevice):
+    # Pull mode source for QAudioOutput. readData is called by the audio output whenever it wants more and
+    # serves the PCMRing an AudioStream decodes into, the stop of a scrub burst, volume and the end of the
+    # stream are handled here. Seeks go through the stream, which only restarts decoding outside the ring.
+    # readData runs on the thread of the output, see AudioDevice, setOffset and setVolume come from the
+    # GUI thread and take lock
+    finished = Signal()
+
+    def __init__(self, stream, parent=None):
+        super(AudioSource, self).__init__(parent)
+        self.stream = stream
+        self.ring = stream.ring
+        self.dtype = np.dtype(stream.currentFormat['np'])
+        self.sampleBytes = stream.frameBytes
+        # Byte a scrub burst ends at
+        self.stop = None
+        self.volume = 1.0
+        self.limits = np.iinfo(self.dtype)
+        # Volume is applied in these, grown to the largest read and reused after that
+        self.scaled = np.zeros(0, dtype=np.float32 if self.dtype.itemsize <= 2 else np.float64)
+        self.clipped = np.zeros(0, dtype=self.dtype)
+        self.ended = False
+        self.lock = threading.Lock()
+
+        self.underruns = 0
+        self.missingBytes = 0
+        self.served = 0
+
+    def align(self, offset):
+        return int(offset) // self.sampleBytes * self.sampleBytes
+
+    def setOffset(self, offset, stop=None):
+        # Byte to play from, stop ends playback early without counting as the end of the stream
+        with self.lock:
+            self.stop = None if stop is None else self.align(stop)
+            self.ended = False
+            self.stream.seek(self.align(offset))
+
+    def setVolume(self, volume):
+        with self.lock:
+            self.volume = max(0.0, float(volume))
+
+    def isComplete(self):
+        return self.stream.isComplete(self.ring.readPos)
+
+    def isSequential(self):
+        return True
+
+    def bytesAvailable(self):
+        return self.ring.readable() + super(AudioSource, self).bytesAvailable()
+
+    def readData(self, maxSize):
+        with self.lock:
+            data, ended = self.pull(maxSize)
+        if ended:
+            self.finished.emit()
+        return data
+
+    def pull(self, maxSize):
+        # data and whether it just reached the end of the stream
+        size = self.align(maxSize)
+        if self.stop is not None:
+            size = min(size, max(0, self.stop - self.ring.readPos))
+        # A view into the ring, copied once into the bytes readData has to return
+        view = self.ring.peek(size)
+        data = view.tobytes() if self.volume == 1.0 else self.scale(view)
+        self.ring.advance(len(view))
+        self.served += len(data)
+        if len(data) < size:
+            if self.isComplete():
+                if not self.ended:
+                    self.ended = True
+                    return data, True
+            else:
+                # Not decoded yet
+                self.underruns += 1
+                self.missingBytes += size - len(data)
+        return data, False
+
+    def scale(self, view):
+        samples = np.frombuffer(view, dtype=self.dtype)
+        count = len(samples)
+        if len(self.scaled) < count:
+            self.scaled = np.zeros(count, dtype=self.scaled.dtype)
+            self.clipped = np.zeros(count, dtype=self.dtype)
+        scaled = self.scaled[:count]
+        np.multiply(samples, self.volume, out=scaled)
+        np.clip(scaled, self.limits.min, self.limits.max, out=scaled)
+        clipped = self.clipped[:count]
+        np.copyto(clipped, scaled, casting='unsafe')
+        return clipped.tobytes()
+
+    def writeData(self, data):
+        return -1
@@ -0,0 +1,194 @@
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PySide2.QtCore import QBuffer, QByteArray, QIODevice, QObject, Signal
+from PySide2.QtGui import QImage
+
+class CompressedCache(QObject):
+    # Second tier under FrameCache, frames evicted from the arena are compressed here on a worker pool
+    # and decompressed on the same pool ahead of the playhead.
+    #   "zlib" : horizontal delta (PNG's Sub filter) on the raw frame, then zlib at level
+    #   "png"  : QImage.save into a QBuffer, only for 8 bit gray, rgb and rgba frames
+    # Frames are independent of each other so any one can be restored without its neighbours.
+    # Raw copies waiting for a worker count against memoryLimit, and at most queueLimit of them wait at
+    # once, frames evicted beyond that are not kept
+    restored = Signal(int, object)
+
+    FORMATS = {1 : QImage.Format_Grayscale8, 3 : QImage.Format_RGB888, 4 : QImage.Format_RGBA8888}
+
+    def __init__(self, shape, dtype=np.uint8, codec="zlib", memoryLimit=256 * 1024**2, level=1, workers=2, behindWeight=4, queueLimit=None, parent=None):
+        super(CompressedCache, self).__init__(parent=parent)
+        if codec not in ("zlib", "png"):
+            raise ValueError(f"Unknown codec {codec!r}, expected 'zlib' or 'png'")
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        if codec == "png" and (self.dtype != np.uint8 or self.shape[2] not in self.FORMATS):
+            raise ValueError("png needs 8 bit frames with 1, 3 or 4 channels")
+        self.codec = codec
+        self.memoryLimit = memoryLimit
+        self.level = level
+        self.behindWeight = behindWeight
+        self.queueLimit = workers * 2 if queueLimit is None else queueLimit
+        self.playhead = 0
+
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.pending = set()
+        self.nbytes = 0
+        # Raw frames copied for compression that no worker has finished yet
+        self.queued = 0
+        self.queuedBytes = 0
+        self.workers = ThreadPoolExecutor(max_workers=workers)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.skipped = 0
+        self.stored = 0
+        self.rawBytes = 0
+        self.compressedBytes = 0
+        self.compressTime = 0
+        self.decompressTime = 0
+        self.decompressed = 0
+
+    def __contains__(self, frame):
+        return frame in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def setPlayhead(self, frame):
+        self.playhead = frame
+
+    def distance(self, frame):
+        if frame >= self.playhead:
+            return frame - self.playhead
+        return (self.playhead - frame) * self.behindWeight
+
+    def compress(self, data):
+        if self.codec == "png":
+            height, width, channels = self.shape
+            image = QImage(data, width, height, data.strides[0], self.FORMATS[channels])
+            array = QByteArray()
+            buffer = QBuffer(array)
+            buffer.open(QIODevice.WriteOnly)
+            # Qt picks the PNG zlib level as (100 - quality) * 9 / 91
+            image.save(buffer, "PNG", 100 - -(-self.level * 91 // 9))
+            buffer.close()
+            return array.data()
+        delta = data.view(np.uint8).reshape(self.shape[0], -1).copy()
+        delta[:, 1:] -= data.view(np.uint8).reshape(self.shape[0], -1)[:, :-1]
+        return zlib.compress(delta, self.level)
+
+    def decompress(self, blob):
+        if self.codec == "png":
+            image = QImage.fromData(blob, "PNG").convertToFormat(self.FORMATS[self.shape[2]])
+            height, width, channels = self.shape
+            rows = np.frombuffer(image.constBits(), dtype=np.uint8, count=image.sizeInBytes()).reshape(height, image.bytesPerLine())
+            return rows[:, :width * channels].reshape(self.shape).copy()
+        delta = np.frombuffer(zlib.decompress(blob), dtype=np.uint8).reshape(self.shape[0], -1)
+        return np.cumsum(delta, axis=1, dtype=np.uint8).view(self.dtype).reshape(self.shape)
+
+    def store(self, frame, data):
+        # FrameCache eviction hook, data is the arena slot about to be reused so it is copied right away.
+        # Skipped while the workers are queueLimit frames behind or the copy would not fit under the limit
+        with self.lock:
+            if frame in self.entries or frame in self.pending:
+                return
+            if self.queued >= self.queueLimit or self.queuedBytes + data.nbytes > self.memoryLimit:
+                self.skipped += 1
+                return
+            self.pending.add(frame)
+            self.queued += 1
+            self.queuedBytes += data.nbytes
+            self.trim()
+        self.workers.submit(self.compressJob, frame, data.copy())
+
+    def compressJob(self, frame, data):
+        start = time.perf_counter()
+        blob = self.compress(data)
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.pending.discard(frame)
+            self.queued -= 1
+            self.queuedBytes -= data.nbytes
+            self.entries[frame] = blob
+            self.nbytes += len(blob)
+            self.stored += 1
+            self.rawBytes += data.nbytes
+            self.compressedBytes += len(blob)
+            self.compressTime += elapsed
+            self.trim()
+
+    def trim(self):
+        # Called with the lock held, drops the frames furthest from the playhead until they and the queued
+        # raw frames are under the limit
+        while self.nbytes + self.queuedBytes > self.memoryLimit and self.entries:
+            frame = max(self.entries, key=self.distance)
+            self.nbytes -= len(self.entries.pop(frame))
+            self.evictions += 1
+
+    def load(self, frame):
+        # Decompressed frame, None when it is not stored
+        with self.lock:
+            blob = self.entries.get(frame)
+            if blob is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return self.timedDecompress(blob)
+
+    def timedDecompress(self, blob):
+        start = time.perf_counter()
+        data = self.decompress(blob)
+        with self.lock:
+            self.decompressTime += time.perf_counter() - start
+            self.decompressed += 1
+        return data
+
+    def prefetch(self, frames):
+        # Decompress stored frames on the pool, each arrives through restored
+        for frame in frames:
+            with self.lock:
+                blob = self.entries.get(frame)
+                if blob is None or frame in self.pending:
+                    continue
+                self.pending.add(frame)
+                self.hits += 1
+            self.workers.submit(self.prefetchJob, frame, blob)
+
+    def prefetchJob(self, frame, blob):
+        data = self.timedDecompress(blob)
+        with self.lock:
+            self.pending.discard(frame)
+        self.restored.emit(frame, data)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+    def close(self):
+        self.workers.shutdown(wait=True)
+        self.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "codec" : self.codec,
+                "frames" : len(self.entries),
+                "bytes" : self.nbytes,
+                "queuedBytes" : self.queuedBytes,
+                "ratio" : self.rawBytes / self.compressedBytes if self.compressedBytes else 0,
+                "compressMs" : self.compressTime * 1000 / self.stored if self.stored else 0,
+                "decompressMs" : self.decompressTime * 1000 / self.decompressed if self.decompressed else 0,
+                "hits" : self.hits,
+                "misses" : self.misses,
+                "hitRate" : self.hits / lookups if lookups else 0,
+                "evictions" : self.evictions,
+                "skipped" : self.skipped,
+            }
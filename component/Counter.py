@@ -0,0 +1,38 @@
+from PySide2.QtCore import QThread, Signal
+
+import ffmpeg
+from component.Supervisor import Supervisor
+
+class Counter(QThread):
+    # Counts the packets of a stream whose container does not store its frame count
+    counted = Signal(int)
+    failed = Signal(str)
+
+    def __init__(self, file, stream="v:0", cache=None, parent=None) -> None:
+        super(Counter, self).__init__(parent=parent)
+        self.file = file
+        self.stream = stream
+        self.cache = cache
+        self.count = None
+        # ffprobe reads the whole file, cancel() kills it
+        self.supervisor = Supervisor()
+
+    def popen(self, args, **kwargs):
+        return self.supervisor.popen(args, interrupted=self.isInterruptionRequested, **kwargs)
+
+    def cancel(self):
+        self.requestInterruption()
+        self.supervisor.kill()
+        self.wait()
+        self.supervisor.cancel()
+
+    def run(self):
+        try:
+            self.count = ffmpeg.count_packets(self.file, stream=self.stream, cache=self.cache, popen=self.popen)
+        except (ffmpeg.Error, OSError) as e:
+            if not self.isInterruptionRequested():
+                self.failed.emit(str(e))
+            return
+        finally:
+            self.supervisor.reapExited()
+        self.counted.emit(self.count)
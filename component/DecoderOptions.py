@@ -0,0 +1,71 @@
+import os
+from dataclasses import dataclass, replace
+from typing import Optional
+
+@dataclass
+class DecoderOptions:
+    # Input side ffmpeg flags for the decoder processes started by Stream
+    threads: int = 0                        # -threads, 0 lets ffmpeg pick from the core count
+    threadType: Optional[str] = None        # -thread_type "frame", "slice" or "frame+slice"
+    lowDelay: bool = False                  # -flags low_delay
+    noBuffer: bool = False                  # -fflags nobuffer
+    probeSize: Optional[int] = None         # -probesize in bytes
+    analyzeDuration: Optional[int] = None   # -analyzeduration in microseconds
+    skipFrame: Optional[str] = None         # -skip_frame "noref", "bidir", "nokey", frames the decoder throws away
+    skipLoopFilter: Optional[str] = None    # -skip_loop_filter, same values, frames decoded without deblocking
+
+    def inputArgs(self):
+        args = {}
+        if self.threads:
+            args['threads'] = self.threads
+        if self.threadType:
+            args['thread_type'] = self.threadType
+        if self.lowDelay:
+            args['flags'] = 'low_delay'
+        if self.noBuffer:
+            args['fflags'] = 'nobuffer'
+        if self.probeSize is not None:
+            args['probesize'] = self.probeSize
+        if self.analyzeDuration is not None:
+            args['analyzeduration'] = self.analyzeDuration
+        if self.skipFrame:
+            args['skip_frame'] = self.skipFrame
+        if self.skipLoopFilter:
+            args['skip_loop_filter'] = self.skipLoopFilter
+        return args
+
+    def catchUp(self):
+        # Cheaper decode for playback that fell behind: non reference frames are not decoded and
+        # nothing is deblocked. Settings already made here are kept
+        return self.copy(skipFrame=self.skipFrame or "noref", skipLoopFilter=self.skipLoopFilter or "all")
+
+    def copy(self, **changes):
+        return replace(self, **changes)
+
+    @classmethod
+    def preset(cls, name):
+        if name not in PRESETS:
+            raise ValueError(f"Unknown decoder preset {name!r}, expected one of {', '.join(PRESETS)}")
+        return PRESETS[name].copy()
+
+    @classmethod
+    def coerce(cls, options):
+        # Accepts None, a preset name or DecoderOptions
+        if options is None:
+            return cls()
+        if isinstance(options, str):
+            return cls.preset(options)
+        return options
+
+PRESETS = {
+    "default" : DecoderOptions(),
+    # Frame threading on every core at the cost of a few frames of latency, left to itself ffmpeg stops
+    # at 16 decoder threads however many cores there are
+    "throughput" : DecoderOptions(threads=os.cpu_count() or 0, threadType="frame+slice"),
+    # Slice threading only and minimal probing so the first frame comes out early
+    "low latency" : DecoderOptions(threadType="slice", lowDelay=True, probeSize=32768, analyzeDuration=0),
+    # nobuffer is for live network inputs, on local files it makes the demuxer drop frames
+    "live" : DecoderOptions(threadType="slice", lowDelay=True, noBuffer=True, probeSize=32768, analyzeDuration=0),
+    # Each frame thread holds its own reference frames, a single thread keeps decoder memory flat
+    "low memory" : DecoderOptions(threads=1, threadType="slice"),
+}
@@ -0,0 +1,174 @@
+import mmap
+import tempfile
+
+import numpy as np
+
+class FrameCache(object):
+    # Preallocated arena holding a window of frames around the playhead.
+    # When full, the frame furthest from the playhead is evicted (least recently used on ties),
+    # frames behind the playhead count behindWeight times as far as frames ahead of it.
+    # With a directory the arena is a memory mapped scratch file there instead of RAM, so the limit
+    # can exceed physical memory and what stays resident is up to the OS page cache
+    def __init__(self, shape, dtype=np.uint8, slots=None, memoryLimit=0, behindWeight=4, directory=None):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.frameSize = int(np.prod(self.shape)) * self.dtype.itemsize
+        # On disk every frame starts on a page boundary so reading one never touches a neighbour's pages
+        self.stride = -(-self.frameSize // mmap.PAGESIZE) * mmap.PAGESIZE if directory else self.frameSize
+        if slots is None:
+            slots = int(memoryLimit // self.stride) if memoryLimit > 0 else 1
+        self.slotCount = max(1, int(slots))
+        self.behindWeight = behindWeight
+
+        self.directory = directory
+        self.file = None
+        self.map = None
+        if directory:
+            self.arena = self.mapArena(directory)
+        else:
+            self.arena = np.empty((self.slotCount,) + self.shape, dtype=self.dtype)
+        self.slotFrame = np.full(self.slotCount, -1, dtype=np.int64)
+        self.slotUsed = np.zeros(self.slotCount, dtype=np.int64)
+        # Bumped whenever a slot is given to another frame, lets readers on other threads detect reuse
+        self.slotVersion = np.zeros(self.slotCount, dtype=np.int64)
+        self.slots = {}
+        self.free = list(range(self.slotCount - 1, -1, -1))
+        self.playhead = 0
+        self.tick = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Called with (frame, data) before an evicted slot is reused, data is only valid during the call
+        self.onEvict = None
+
+    @classmethod
+    def fromLimit(cls, shape, fps, dtype=np.uint8, memoryLimit=0, unit="bytes", directory=None):
+        if unit == "seconds":
+            slots = int(np.ceil(memoryLimit * fps)) if memoryLimit > 0 else None
+            return cls(shape, dtype=dtype, slots=slots, directory=directory)
+        return cls(shape, dtype=dtype, memoryLimit=memoryLimit, directory=directory)
+
+    def mapArena(self, directory):
+        # Unlinked as soon as it is created, the space is given back when the mapping closes
+        self.file = tempfile.TemporaryFile(prefix="ffmpyside-frames-", dir=directory)
+        self.file.truncate(self.slotCount * self.stride)
+        self.map = np.memmap(self.file, dtype=np.uint8, mode="r+", shape=(self.slotCount * self.stride,))
+        frameStrides = np.empty(self.shape, dtype=self.dtype).strides
+        return np.ndarray((self.slotCount,) + self.shape, dtype=self.dtype, buffer=self.map, strides=(self.stride,) + frameStrides)
+
+    @property
+    def onDisk(self):
+        return self.map is not None
+
+    @property
+    def nbytes(self):
+        return self.slotCount * self.stride
+
+    def close(self):
+        # Only needed on disk. The mapping itself goes once the last frame handed out by get() is dropped
+        if self.map is None:
+            return
+        self.clear()
+        self.arena = None
+        self.map = None
+        self.file.close()
+        self.file = None
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, frame):
+        return frame in self.slots
+
+    def frames(self):
+        return sorted(self.slots)
+
+    def setPlayhead(self, frame):
+        self.playhead = frame
+
+    def distance(self, frame):
+        if frame >= self.playhead:
+            return frame - self.playhead
+        return (self.playhead - frame) * self.behindWeight
+
+    def evictionCandidate(self):
+        used = self.slotFrame >= 0
+        if not used.any():
+            return None
+        frames = self.slotFrame
+        distance = np.where(frames >= self.playhead, frames - self.playhead, (self.playhead - frames) * self.behindWeight)
+        distance = np.where(used, distance, -1)
+        furthest = distance.max()
+        candidates = np.flatnonzero(distance == furthest)
+        return int(candidates[np.argmin(self.slotUsed[candidates])])
+
+    def acquire(self, frame):
+        # Writable slot for frame, None when the frame is further away than everything cached
+        if frame in self.slots:
+            return self.arena[self.slots[frame]]
+        if self.free:
+            slot = self.free.pop()
+        else:
+            slot = self.evictionCandidate()
+            evicted = int(self.slotFrame[slot])
+            if self.distance(frame) >= self.distance(evicted):
+                return None
+            if self.onEvict is not None:
+                self.onEvict(evicted, self.arena[slot])
+            del self.slots[evicted]
+            self.evictions += 1
+        self.tick += 1
+        self.slots[frame] = slot
+        self.slotVersion[slot] += 1
+        self.slotFrame[slot] = frame
+        self.slotUsed[slot] = self.tick
+        return self.arena[slot]
+
+    def put(self, frame, data):
+        target = self.acquire(frame)
+        if target is None:
+            return False
+        target[...] = data.reshape(self.shape)
+        return True
+
+    def get(self, frame):
+        slot = self.slots.get(frame)
+        if slot is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.tick += 1
+        self.slotUsed[slot] = self.tick
+        return self.arena[slot]
+
+    def peek(self, frame):
+        # Like get() without counting a lookup or touching the LRU order
+        slot = self.slots.get(frame)
+        return None if slot is None else self.arena[slot]
+
+    def version(self, frame):
+        slot = self.slots.get(frame)
+        return None if slot is None else int(self.slotVersion[slot])
+
+    def discard(self, frame):
+        slot = self.slots.pop(frame, None)
+        if slot is not None:
+            self.slotFrame[slot] = -1
+            self.free.append(slot)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "frames" : len(self.slots),
+            "bytes" : self.nbytes,
+            "hits" : self.hits,
+            "misses" : self.misses,
+            "hitRate" : self.hits / lookups if lookups else 0,
+            "evictions" : self.evictions,
+        }
+
+    def clear(self):
+        self.slots.clear()
+        self.slotFrame[:] = -1
+        self.free = list(range(self.slotCount - 1, -1, -1))
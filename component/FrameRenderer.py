@@ -0,0 +1,64 @@
+from PySide2.QtCore import QPoint, QRect, QSize, Qt
+from PySide2.QtGui import QPixmap, QRegion
+
+class FrameRenderer(object):
+    # Paint path shared by the Viewer and benchmark/renderbench.py.
+    # While playing every paint is a new frame, it is drawn straight into the target with nearest scaling
+    # (an intermediate scaled copy only adds a pass). Once paused the frame is scaled smoothly once per
+    # (frame, widget size) and repaints of it (expose, overlays) are a plain blit.
+    # Meant for widgets with WA_OpaquePaintEvent,
+    # the letterbox is only filled when the paint region reaches outside the frame, new frames
+    # update frameRect() alone so the bars are painted on resize and expose only
+    def __init__(self, background=Qt.black):
+        self.background = background
+        self.cached = None
+        self.scales = 0
+
+    @staticmethod
+    def frameRect(size, ratio):
+        # Largest rect of ratio centred in size
+        width, height = size.width(), size.height()
+        if width <= 0 or height <= 0:
+            return QRect()
+        if width > height * ratio:
+            fitted = QSize(max(1, round(height * ratio)), height)
+        else:
+            fitted = QSize(width, max(1, round(width / ratio)))
+        return QRect(QPoint((width - fitted.width()) // 2, (height - fitted.height()) // 2), fitted)
+
+    def scaled(self, image, size, dpr=1.0, smooth=False):
+        pixels = QSize(round(size.width() * dpr), round(size.height() * dpr))
+        key = (image.cacheKey(), pixels.width(), pixels.height(), smooth)
+        if self.cached is not None and self.cached[0] == key:
+            return self.cached[1]
+        if image.size() == pixels:
+            result = image
+        else:
+            mode = Qt.SmoothTransformation if smooth else Qt.FastTransformation
+            result = image.scaled(pixels, Qt.IgnoreAspectRatio, mode)
+            self.scales += 1
+        if result.devicePixelRatio() != dpr:
+            result.setDevicePixelRatio(dpr)
+        self.cached = (key, result)
+        return result
+
+    def clear(self):
+        self.cached = None
+
+    def paint(self, painter, region, size, ratio, image=None, dpr=1.0, smooth=False):
+        target = self.frameRect(size, ratio)
+        if image is None or not target.contains(region.boundingRect()):
+            bars = region if image is None else region.subtracted(QRegion(target))
+            painter.setClipRegion(bars)
+            painter.fillRect(QRect(QPoint(0, 0), size), self.background)
+            painter.setClipping(False)
+        if image is None or target.isEmpty():
+            return
+        if smooth:
+            image = self.scaled(image, target.size(), dpr, smooth)
+            target = target.topLeft()
+        # Without SmoothPixmapTransform the raster engine scales nearest
+        if isinstance(image, QPixmap):
+            painter.drawPixmap(target, image)
+        else:
+            painter.drawImage(target, image)
@@ -0,0 +1,94 @@
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide2.QtCore import QObject, Signal
+from PySide2.QtGui import QImage
+
+class ImageQueue(QObject):
+    # QImages of upcoming frames converted on a worker thread, in the format the raster paint engine draws
+    # without converting again. The GUI thread only requests and takes, a conversion is dropped when the
+    # frame cache slot it was read from has been reused in the meantime (isCurrent). Frames whose display
+    # deadline passed before the worker got to them are skipped (isLate)
+    converted = Signal(int, int, object)
+
+    # Source format and what it is converted to for drawing
+    TARGETS = {
+        QImage.Format_Grayscale8 : QImage.Format_RGB32,
+        QImage.Format_RGB888 : QImage.Format_RGB32,
+        QImage.Format_RGBA8888_Premultiplied : QImage.Format_ARGB32_Premultiplied,
+    }
+
+    def __init__(self, depth=4, parent=None):
+        super(ImageQueue, self).__init__(parent=parent)
+        self.depth = depth
+        self.images = OrderedDict()
+        self.pending = set()
+        self.isCurrent = lambda frame, version: True
+        self.isLate = lambda frame: False
+        self.workers = ThreadPoolExecutor(max_workers=1)
+        self.converted.connect(self.store)
+
+        self.taken = 0
+        self.dropped = 0
+        self.late = 0
+        self.convertTime = 0
+        self.convertCount = 0
+
+    def __contains__(self, frame):
+        return frame in self.images
+
+    def request(self, frame, version, data, imageFormat):
+        if frame in self.images or frame in self.pending:
+            return
+        self.pending.add(frame)
+        self.workers.submit(self.convert, frame, version, data, imageFormat)
+
+    def convert(self, frame, version, data, imageFormat):
+        if self.isLate(frame):
+            self.converted.emit(frame, version, None)
+            return
+        start = time.perf_counter()
+        image = QImage(data, data.shape[1], data.shape[0], data.strides[0], imageFormat)
+        # convertToFormat always returns a detached image, so the arena slot is free to change afterwards
+        image = image.convertToFormat(self.TARGETS.get(imageFormat, QImage.Format_RGB32))
+        self.convertTime += time.perf_counter() - start
+        self.convertCount += 1
+        self.converted.emit(frame, version, image)
+
+    def store(self, frame, version, image):
+        if frame not in self.pending:
+            # Cleared while converting
+            return
+        self.pending.discard(frame)
+        if image is None:
+            self.late += 1
+            return
+        if not self.isCurrent(frame, version):
+            self.dropped += 1
+            return
+        self.images[frame] = image
+        while len(self.images) > self.depth:
+            self.images.popitem(last=False)
+
+    def take(self, frame):
+        image = self.images.pop(frame, None)
+        if image is not None:
+            self.taken += 1
+        return image
+
+    def clear(self):
+        self.images.clear()
+        self.pending.clear()
+
+    def close(self):
+        self.clear()
+        self.workers.shutdown(wait=True)
+
+    def stats(self):
+        return {
+            "taken" : self.taken,
+            "dropped" : self.dropped,
+            "late" : self.late,
+            "convertMs" : self.convertTime * 1000 / self.convertCount if self.convertCount else 0,
+        }
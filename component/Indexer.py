@@ -0,0 +1,36 @@
+from PySide2.QtCore import QThread, Signal
+
+import ffmpeg
+from component.Supervisor import Supervisor
+
+class Indexer(QThread):
+    indexed = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, file, stream="v:0", parent=None) -> None:
+        super(Indexer, self).__init__(parent=parent)
+        self.file = file
+        self.stream = stream
+        self.index = None
+        # ffprobe reads the whole file, cancel() kills it
+        self.supervisor = Supervisor()
+
+    def popen(self, args, **kwargs):
+        return self.supervisor.popen(args, interrupted=self.isInterruptionRequested, **kwargs)
+
+    def cancel(self):
+        self.requestInterruption()
+        self.supervisor.kill()
+        self.wait()
+        self.supervisor.cancel()
+
+    def run(self):
+        try:
+            self.index = ffmpeg.packet_index(self.file, stream=self.stream, popen=self.popen)
+        except (ffmpeg.Error, OSError) as e:
+            if not self.isInterruptionRequested():
+                self.failed.emit(str(e))
+            return
+        finally:
+            self.supervisor.reapExited()
+        self.indexed.emit(self.index)
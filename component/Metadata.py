@@ -0,0 +1,51 @@
+from fractions import Fraction
+
+def rational(value):
+    # ffprobe rationals such as "30000/1001", None for missing, malformed or "0/0"
+    try:
+        number = Fraction(str(value))
+    except (ValueError, ZeroDivisionError):
+        return None
+    return number if number > 0 else None
+
+def timecode(value):
+    # Seconds from "12.5" or the "HH:MM:SS.fraction" Matroska keeps in its DURATION tag
+    try:
+        seconds = 0.0
+        for part in str(value).split(":"):
+            seconds = seconds * 60 + float(part)
+    except ValueError:
+        return None
+    return seconds if seconds > 0 else None
+
+def streamDuration(info, probe=None):
+    # Stream duration, then the stream DURATION tag, then the container duration
+    candidates = [info.get('duration'), info.get('tags', {}).get('DURATION')]
+    if probe:
+        candidates.append(probe.get('format', {}).get('duration'))
+    for value in candidates:
+        seconds = timecode(value) if value is not None else None
+        if seconds:
+            return seconds
+    return None
+
+def frameRate(info):
+    # avg_frame_rate is the real rate for variable frame rate files, r_frame_rate is the
+    # lowest common timebase and only a fallback
+    for key in ('avg_frame_rate', 'r_frame_rate'):
+        rate = rational(info.get(key))
+        if rate:
+            return rate
+    return None
+
+def frameCount(info, fps=None, duration=None):
+    # (count, exact), nb_frames when the container stores it, otherwise an estimate from the duration
+    try:
+        count = int(info.get('nb_frames', 0))
+    except (TypeError, ValueError):
+        count = 0
+    if count > 0:
+        return count, True
+    if fps and duration:
+        return max(1, int(round(duration * fps))), False
+    return 1, False
@@ -0,0 +1,34 @@
+import time
+
+from PySide2.QtCore import QThread, Signal
+
+import ffmpeg
+from component.Stream import Stream
+
+class Opener(QThread):
+    # Probes a file off the GUI thread, the widget builds its stream from the result.
+    # Both signals carry the opener so a widget can tell a superseded open from the current one.
+    # codec is the kind of stream the widget plays, "video" or "audio", a file without one fails
+    opened = Signal(object)
+    failed = Signal(object, str)
+
+    def __init__(self, file, codec=None, parent=None) -> None:
+        super(Opener, self).__init__(parent=parent)
+        self.file = file
+        self.codec = codec
+        self.probe = None
+        self.elapsed = 0
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            self.probe = ffmpeg.probe(self.file, cache=Stream.probeCache)
+        except (ffmpeg.Error, OSError) as e:
+            self.failed.emit(self, str(e))
+            return
+        if self.codec is not None and not any(stream.get('codec_type') == self.codec for stream in self.probe.get('streams', [])):
+            self.failed.emit(self, f"No {self.codec} stream in {self.file}")
+            return
+        self.elapsed = (time.perf_counter() - start) * 1000
+        if not self.isInterruptionRequested():
+            self.opened.emit(self)
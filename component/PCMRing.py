@@ -0,0 +1,106 @@
+import numpy as np
+
+class PCMRing(object):
+    # Fixed size window of a decoded audio track between one decoder thread and the audio output, no
+    # lock: the writer only moves writePos, the reader only moves readPos, each reads the other's index
+    # once per call. Positions are byte offsets into the whole track, so full and empty never look alike.
+    # write takes what fits and returns the count, waiting for room is up to the writer, see
+    # AudioStream.writePacket, so nothing on the reader side ever blocks. The last history bytes read are
+    # never written over, seeking back into them or a little ahead of the writer only moves the reader.
+    # reset is for while neither side runs
+    def __init__(self, capacity, frameBytes=1, history=0):
+        self.frameBytes = max(1, int(frameBytes))
+        self.capacity = max(self.frameBytes, int(capacity) // self.frameBytes * self.frameBytes)
+        # Never written over by the writer, at most half the ring
+        self.history = min(int(history) // self.frameBytes * self.frameBytes, self.capacity // 2)
+        self.data = np.zeros(self.capacity, dtype=np.uint8)
+        # Both ends of a read that wraps around, grown on demand
+        self.scratch = np.zeros(0, dtype=np.uint8)
+        self.reset(0)
+
+    def reset(self, position, start=None):
+        # Empty, read from position. The writer restarts at start, at or before position, and whatever it
+        # writes before position is dropped
+        self.readPos = position
+        self.writePos = position if start is None else start
+        # Oldest byte still held, only the writer moves it
+        self.first = self.writePos
+        self.ended = False
+
+    def seek(self, position, ahead=0):
+        # Reader, moves to position without decoding again. False when position is not held and is more
+        # than ahead bytes past the writer. Below max(first, readPos - history) the writer may already be
+        # writing over it
+        readPos = self.readPos
+        if not max(self.first, readPos - self.history) <= position <= self.writePos + ahead:
+            return False
+        self.readPos = position
+        return True
+
+    def rewind(self, position):
+        # Writer, resumes at position, e.g. the start of a packet it was cut off in. What it writes again
+        # up to the old writePos is the same audio
+        if position < self.writePos:
+            self.writePos = max(position, self.first)
+
+    def readable(self):
+        return max(0, self.writePos - self.readPos) // self.frameBytes * self.frameBytes
+
+    def writable(self):
+        # Bytes the writer may add, keeping history bytes behind the reader when it has them
+        readPos = self.readPos
+        kept = min(self.history, max(0, readPos - self.first))
+        return self.capacity - kept - max(0, self.writePos - readPos)
+
+    def write(self, data):
+        # Writer, copies as much of data as fits and returns the byte count. After a seek ahead of the
+        # writer, bytes before the reader count as written without being kept
+        source = memoryview(data).cast('B')
+        writePos = self.writePos
+        behind = min(len(source), self.readPos - writePos)
+        if behind > 0:
+            self.first = writePos + behind
+            self.writePos = writePos + behind
+            return behind
+        count = min(len(source), self.writable())
+        if count <= 0:
+            return 0
+        start = writePos % self.capacity
+        first = min(count, self.capacity - start)
+        self.data[start:start + first] = source[:first]
+        self.data[:count - first] = source[first:count]
+        self.first = max(self.first, writePos + count - self.capacity)
+        self.writePos = writePos + count
+        return count
+
+    def finish(self):
+        # Writer, nothing comes after writePos, the reader reaching it is the end of the track. A track can
+        # end mid sample
+        self.writePos -= self.writePos % self.frameBytes
+        self.ended = True
+
+    def peek(self, size):
+        # Reader, up to size bytes of whole samples from readPos, fewer while the writer is behind. A view
+        # into the ring valid until advance, only a read that wraps around is copied, into scratch
+        readPos = self.readPos
+        count = max(0, min(size, self.writePos - readPos)) // self.frameBytes * self.frameBytes
+        start = readPos % self.capacity
+        if start + count <= self.capacity:
+            return memoryview(self.data)[start:start + count]
+        if len(self.scratch) < count:
+            self.scratch = np.zeros(count, dtype=np.uint8)
+        first = self.capacity - start
+        self.scratch[:first] = self.data[start:]
+        self.scratch[first:count] = self.data[:count - first]
+        return memoryview(self.scratch)[:count]
+
+    def advance(self, size):
+        self.readPos += size
+
+    def read(self, size):
+        data = self.peek(size).tobytes()
+        self.advance(len(data))
+        return data
+
+    def isComplete(self):
+        return self.ended and self.readPos >= self.writePos
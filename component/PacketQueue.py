@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import deque
+
+class PacketQueue(object):
+    # Lock protected ring of (index, data) packets between a decoder thread and the GUI thread.
+    # The producer asks for a wakeup once a batch is full or old enough, the consumer drains everything queued
+    def __init__(self, batchSize=1, interval=0):
+        self.lock = threading.Lock()
+        self.items = deque()
+        self.batchSize = batchSize
+        self.interval = interval
+        self.wakePending = False
+        self.oldest = None
+
+        self.packets = 0
+        self.wakeups = 0
+        self.drains = 0
+        self.startTime = time.perf_counter()
+
+    @property
+    def enabled(self):
+        return self.batchSize > 1 or self.interval > 0
+
+    def push(self, index, data):
+        # True when the consumer needs to be woken up
+        now = time.perf_counter()
+        with self.lock:
+            self.items.append((index, data))
+            self.packets += 1
+            if self.oldest is None:
+                self.oldest = now
+            due = len(self.items) >= self.batchSize or (now - self.oldest) * 1000 >= self.interval
+            return self.wake(due)
+
+    def flush(self):
+        with self.lock:
+            return self.wake(bool(self.items))
+
+    def wake(self, due):
+        if not due or self.wakePending:
+            return False
+        self.wakePending = True
+        self.wakeups += 1
+        return True
+
+    def drain(self):
+        with self.lock:
+            items = list(self.items)
+            self.items.clear()
+            self.oldest = None
+            self.wakePending = False
+            self.drains += 1
+        return items
+
+    def clear(self):
+        return self.drain()
+
+    def __len__(self):
+        return len(self.items)
+
+    def stats(self):
+        elapsed = max(time.perf_counter() - self.startTime, 1e-9)
+        return {
+            "packets" : self.packets,
+            "wakeups" : self.wakeups,
+            "packetsPerWakeup" : self.packets / max(self.wakeups, 1),
+            "wakeupsPerSecond" : self.wakeups / elapsed,
+            "packetsPerSecond" : self.packets / elapsed,
+        }
+
+    def resetStats(self):
+        with self.lock:
+            self.packets = 0
+            self.wakeups = 0
+            self.drains = 0
+            self.startTime = time.perf_counter()
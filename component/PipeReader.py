@@ -0,0 +1,96 @@
+import io
+import threading
+from collections import deque
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+F_SETPIPE_SZ = getattr(fcntl, "F_SETPIPE_SZ", 1031)
+F_GETPIPE_SZ = getattr(fcntl, "F_GETPIPE_SZ", 1032)
+
+def pipeMaxSize():
+    try:
+        with open("/proc/sys/fs/pipe-max-size") as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return 0
+
+def setPipeSize(fd, size):
+    # Linux only, returns the pipe capacity actually in effect (0 when unknown)
+    if fcntl is None:
+        return 0
+    for candidate in (size, pipeMaxSize()):
+        if candidate <= 0:
+            continue
+        try:
+            return fcntl.fcntl(fd, F_SETPIPE_SZ, candidate)
+        except OSError:
+            continue
+    try:
+        return fcntl.fcntl(fd, F_GETPIPE_SZ)
+    except OSError:
+        return 0
+
+class FramePool(object):
+    # Fixed set of frame buffers handed to the reader and given back by the consumer
+    def __init__(self, shape, dtype=np.uint8, count=8):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.count = count
+        self.buffers = deque(np.empty(self.shape, dtype=self.dtype) for i in range(count))
+        self.condition = threading.Condition()
+        self.closed = False
+
+    def acquire(self, timeout=None):
+        with self.condition:
+            if not self.buffers and not self.closed:
+                self.condition.wait(timeout)
+            if self.closed or not self.buffers:
+                return None
+            # Most recently released first, it is the one still warm in cache
+            return self.buffers.pop()
+
+    def release(self, buffer):
+        if buffer is None or buffer.shape != self.shape:
+            return
+        with self.condition:
+            self.buffers.append(buffer)
+            self.condition.notify()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    @property
+    def available(self):
+        return len(self.buffers)
+
+class PipeReader(object):
+    # Unbuffered reads from a pipe straight into caller owned buffers
+    def __init__(self, pipe, pipeSize=1 << 24):
+        self.fd = pipe.fileno()
+        self.pipeSize = setPipeSize(self.fd, pipeSize)
+        self.raw = io.FileIO(self.fd, "rb", closefd=False)
+        self.bytesRead = 0
+
+    def readinto(self, buffer):
+        # Fill buffer completely, False on EOF before it is full
+        view = memoryview(buffer).cast("B")
+        size = len(view)
+        filled = 0
+        while filled < size:
+            n = self.raw.readinto(view[filled:])
+            if not n:
+                self.bytesRead += filled
+                return False
+            filled += n
+        self.bytesRead += filled
+        return True
+
+    def close(self):
+        self.raw.close()
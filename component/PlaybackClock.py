@@ -0,0 +1,108 @@
+import math
+import time
+
+from PySide2.QtCore import QObject, Qt, QTimer, Signal
+
+class PlaybackClock(QObject):
+    # Media time in seconds on time.perf_counter_ns. The time is only ever derived from an anchor
+    # (media time, counter) set by start, pause, setTime and setRate, nothing is accumulated per tick so
+    # pausing, resuming and changing rate do not drift. One clock can be shared, e.g. by a Viewer and a
+    # Speaker playing the same file, each waking itself up through a DeadlineTimer.
+    # With a master (e.g. Speaker.position) sync() pulls the clock towards it: offsets under threshold are
+    # slewed away a fraction at a time, anything larger is a jump
+    rateChanged = Signal(float)
+    timeChanged = Signal(float)
+    runningChanged = Signal(bool)
+
+    def __init__(self, parent=None):
+        super(PlaybackClock, self).__init__(parent=parent)
+        self.rate = 1.0
+        self.anchorTime = 0.0
+        # None while paused
+        self.anchorNs = None
+        self.master = None
+        self.threshold = 0.05
+        self.slew = 0.1
+
+    def isRunning(self):
+        return self.anchorNs is not None
+
+    def time(self):
+        if self.anchorNs is None:
+            return self.anchorTime
+        return self.anchorTime + (time.perf_counter_ns() - self.anchorNs) * self.rate / 1e9
+
+    def start(self):
+        if self.anchorNs is not None: return
+        self.anchorNs = time.perf_counter_ns()
+        self.runningChanged.emit(True)
+
+    def pause(self):
+        if self.anchorNs is None: return
+        self.anchorTime = self.time()
+        self.anchorNs = None
+        self.runningChanged.emit(False)
+
+    def setTime(self, seconds):
+        # Jump, running clocks carry on from seconds
+        self.anchorTime = seconds
+        if self.anchorNs is not None:
+            self.anchorNs = time.perf_counter_ns()
+        self.timeChanged.emit(seconds)
+
+    def setRate(self, rate):
+        if rate == self.rate: return
+        self.anchorTime = self.time()
+        if self.anchorNs is not None:
+            self.anchorNs = time.perf_counter_ns()
+        self.rate = rate
+        self.rateChanged.emit(rate)
+
+    def setMaster(self, position=None, threshold=0.05, slew=0.1):
+        # position() returns the master's media seconds, or None while it has nothing to go by
+        self.master = position
+        self.threshold = threshold
+        self.slew = slew
+
+    def sync(self):
+        # Master minus clock in seconds before correcting, None without a master or while paused.
+        # Corrections move the anchor quietly, timeChanged is for seeks
+        if self.master is None or self.anchorNs is None:
+            return None
+        position = self.master()
+        if position is None:
+            return None
+        now = time.perf_counter_ns()
+        current = self.anchorTime + (now - self.anchorNs) * self.rate / 1e9
+        offset = position - current
+        self.anchorTime = position if abs(offset) > self.threshold else current + offset * self.slew
+        self.anchorNs = now
+        return offset
+
+    def delayUntil(self, seconds):
+        # Wall clock milliseconds until the clock reads seconds, rounded up so a wakeup is never early.
+        # None when it will not get there (paused, stopped or running backwards)
+        if self.anchorNs is None or self.rate <= 0:
+            return None
+        return max(0, math.ceil((seconds - self.time()) / self.rate * 1000))
+
+class DeadlineTimer(QTimer):
+    # Single shot precise timer fired when clock reaches a media time, instead of polling it
+    def __init__(self, clock, parent=None):
+        super(DeadlineTimer, self).__init__(parent=parent)
+        self.setSingleShot(True)
+        self.setTimerType(Qt.PreciseTimer)
+        self.clock = clock
+        self.wakeups = 0
+        self.timeout.connect(self.count)
+
+    def count(self):
+        self.wakeups += 1
+
+    def wakeAt(self, seconds):
+        delay = self.clock.delayUntil(seconds)
+        if delay is None:
+            self.stop()
+            return False
+        self.start(delay)
+        return True
@@ -1,25 +1,93 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 from PySide2.QtCore import QThread, Signal
 from PySide2.QtGui import QImage
 
 import ffmpeg
+from component.Counter import Counter
+from component.DecoderOptions import DecoderOptions
+from component.Indexer import Indexer
+from component.Metadata import frameCount, frameRate, streamDuration
+from component.PacketQueue import PacketQueue
+from component.PCMRing import PCMRing
+from component.PipeReader import FramePool, PipeReader
+from component.Supervisor import Supervisor
+from component.YUV import YUVConverter, colorMatrix, frameSize
 
 class Stream(QThread):
-    packet = Signal(object)
+    packet = Signal(int, object)
+    packetsReady = Signal()
+    # Shared by every stream so the audio and video of a file, and reopening it, only run ffprobe once
+    probeCache = ffmpeg.ProbeCache.on_disk()
 
-    def __init__(self, file, codec, parent=None) -> None:
+    def __init__(self, file, codec, options=None, probe=None, parent=None) -> None:
         super(Stream, self).__init__(parent=parent)
         self.file = file
         self.codec = codec
+        self.options = DecoderOptions.coerce(options)
+        self.queue = PacketQueue()
+        self.supervisor = Supervisor()
 
-        probe = ffmpeg.probe(file)
+        # probe is the ffprobe result when the caller already has it, see Opener
+        if probe is None:
+            probe = ffmpeg.probe(file, cache=Stream.probeCache)
+        self.probe = probe
         self.info = next((stream for stream in probe['streams'] if stream['codec_type'] == self.codec), None)
 
+    def wake(self):
+        # Interrupts anything the decoder thread may be waiting on besides the pipe
+        pass
+
+    def cancel(self):
+        # Kill the decoder processes, their readers hit EOF, so the thread ends and reaps them
+        self.requestInterruption()
+        self.wake()
+        self.supervisor.kill()
+        self.wait()
+        self.supervisor.cancel()
+
+    def close(self):
+        # cancel() stops the current decode and is part of every seek, close() is for good
+        self.cancel()
+
+    def setBatching(self, frames=1, interval=0):
+        # Deliver packets through the queue, waking the consumer every frames packets or interval ms.
+        # Consumers connect packetsReady and call drain(), packet is only emitted when batching is off
+        self.queue.batchSize = max(1, int(frames))
+        self.queue.interval = interval
+
+    def deliver(self, index, data):
+        if not self.queue.enabled:
+            self.queue.packets += 1
+            self.queue.wakeups += 1
+            self.packet.emit(index, data)
+        elif self.queue.push(index, data):
+            self.packetsReady.emit()
+
+    def flush(self):
+        if self.queue.flush():
+            self.packetsReady.emit()
+
+    def drain(self):
+        return self.queue.drain()
+
+    def deliveryStats(self):
+        return self.queue.stats()
+
 class VideoStream(Stream):
-    def __init__(self, file, bit=24, parent=None) -> None:
-        super().__init__(file, codec="video", parent=parent)
+    segmentProgress = Signal(int, int, int)
+    frameCountChanged = Signal(int)
+
+    def __init__(self, file, bit=24, transport="rgb", options=None, probe=None, parent=None) -> None:
+        super().__init__(file, codec="video", options=options, probe=probe, parent=parent)
 
         self.bit = bit
+        self.transport = transport
         self.imageFormat = {
             8 : {"np" : np.uint8, 'rgb' : 'gray', "ch": 1, "qt" :  QImage.Format_Grayscale8}, # Gray Scale
             24 : {"np" : np.uint8, 'rgb' : 'rgb24', "ch": 3, "qt" : QImage.Format_RGB888}, # RGB 8Bit
@@ -27,11 +95,15 @@ class VideoStream(Stream):
         }
 
         if self.info:
-            frames = int(eval(self.info['nb_frames'])) if 'nb_frames' in self.info else 1
-            duration = float(eval(self.info['duration'])) if 'duration' in self.info else 1
+            fps = frameRate(self.info)
+            duration = streamDuration(self.info, self.probe)
+            frames, exact = frameCount(self.info, fps, duration)
+            if fps is None:
+                fps = frames / duration if duration else 25
+            if duration is None:
+                duration = frames / fps
             width = int(self.info['width'])
             height = int(self.info['height'])
-            fps = frames/duration
             pix_fmt = self.info['pix_fmt']
             self.metadata = {
                 "format" : pix_fmt,
@@ -39,36 +111,355 @@ class VideoStream(Stream):
                 "height" : height,
                 "duration" : duration,
                 "frameCount" : frames,
-                "fps" : fps,
+                # False while frameCount is estimated from the duration, the counter replaces it
+                "frameCountExact" : exact,
+                "fps" : float(fps),
                 "bit" : self.bit
             }
             self.currentFormat = self.imageFormat[self.bit]
+            self.converter = YUVConverter(colorMatrix(self.info), fullRange=self.info.get('color_range') == 'pc')
+        self.workerCount = max(1, min(4, os.cpu_count() or 1))
+        self.workers = None
+        self.startFrame = 0
+        self.lastRestart = 0
+        self.segments = 1
+        self.segmentLimit = None
+        self.decodeStop = 0
+        # Flow control, sequential decoding stays at most lookahead frames past the playhead
+        self.flow = threading.Condition()
+        self.playhead = 0
+        self.lookahead = None
+        # Size of the emitted frames, the source size unless a scaled output is requested
+        self.frameWidth = self.metadata['width']
+        self.frameHeight = self.metadata['height']
+        # Playback fell behind, see setCatchUp. With dropLate frames behind the playhead are read off the
+        # pipe and given straight back instead of being converted and delivered
+        self.catchingUp = False
+        self.dropLate = False
+        self.catchUpFrames = 0
+        self.lateFrames = 0
+        # Emitted frames are borrowed from the pool, consumers hand them back with release()
+        self.createPool()
 
-    def run(self):
-        packetSize = self.metadata['height'] * self.metadata['width'] * self.currentFormat['ch'] 
-        stream = (
-            ffmpeg
-            .input(self.file)
-            .output(
-                'pipe:', 
-                format='rawvideo', 
-                pix_fmt=self.currentFormat['rgb']
-            )
-            .run_async(pipe_stdout=True)
-        )
-        
-        while stream.poll() is None:
-            packet = stream.stdout.read(packetSize)
+        self.index = None
+        self.indexer = Indexer(file, parent=self)
+        self.indexer.indexed.connect(self.setIndex)
+        self.indexer.start()
+
+        self.counter = None
+        if not self.metadata['frameCountExact']:
+            self.counter = Counter(file, cache=Stream.probeCache, parent=self)
+            self.counter.counted.connect(self.setFrameCount)
+            self.counter.start()
+
+    @property
+    def frameShape(self):
+        return (self.frameHeight, self.frameWidth, self.currentFormat['ch'])
+
+    @property
+    def isScaled(self):
+        return (self.frameWidth, self.frameHeight) != (self.metadata['width'], self.metadata['height'])
+
+    @property
+    def usesYUV(self):
+        # yuv420p halves the pipe bandwidth of rgb24, frames are converted on the worker pool
+        return self.transport == "yuv420p" and self.bit == 24 and self.frameWidth % 2 == 0 and self.frameHeight % 2 == 0
+
+    def createPool(self):
+        self.pool = FramePool(self.frameShape, dtype=self.currentFormat['np'], count=8 * self.segments)
+        self.yuvPool = FramePool((frameSize(self.frameWidth, self.frameHeight),), count=(self.workerCount + 2) * self.segments) if self.usesYUV else None
+
+    def setSegments(self, count=1, limit=None):
+        # Decode frames startFrame to startFrame+limit (or the end) in count concurrent processes,
+        # split on keyframes. One process keeps decoding sequentially to the end of the file
+        count = max(1, int(count))
+        self.segmentLimit = limit
+        if count == self.segments:
+            return False
+        self.cancel()
+        self.segments = count
+        self.createPool()
+        return True
+
+    def segmentBounds(self, start, stop):
+        # Boundaries moved back to the keyframe before them, so no segment decodes frames it throws away
+        index = self.index
+        if index is None:
             try:
-                frame = np.frombuffer(packet, self.currentFormat['np']).reshape([self.metadata['height'], self.metadata['width'], 3])
-                self.packet.emit(frame)
-                stream.stdout.flush()
-            except:
-                pass
+                index = ffmpeg.packet_index(self.file)
+            except (ffmpeg.Error, OSError):
+                index = None
+        bounds = [start]
+        for i in range(1, self.segments):
+            bound = start + (stop - start) * i // self.segments
+            if index is not None:
+                bound = index.keyframe_before(bound)
+            if bound > bounds[-1]:
+                bounds.append(bound)
+        bounds.append(stop)
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def setTransport(self, transport="rgb"):
+        # "rgb" pipes frames in the display format, "yuv420p" pipes planar yuv and converts in python
+        if transport == self.transport:
+            return False
+        self.cancel()
+        self.transport = transport
+        self.createPool()
+        return True
+
+    def setCatchUp(self, enabled=True):
+        # Decode with DecoderOptions.catchUp until playback is back ahead. Stops decoding, the caller seeks
+        # to restart it
+        if enabled == self.catchingUp:
+            return False
+        self.cancel()
+        self.catchingUp = enabled
+        return True
+
+    def setDropLate(self, enabled=True):
+        self.dropLate = enabled
+
+    def isLate(self, index):
+        return self.dropLate and index < self.playhead
+
+    def lateStats(self):
+        return {"catchUp" : self.catchUpFrames, "late" : self.lateFrames}
+
+    def setOutputSize(self, width=None, height=None):
+        # None restores the source resolution. Stops decoding, the caller seeks to restart it
+        width = width or self.metadata['width']
+        height = height or self.metadata['height']
+        if (width, height) == (self.frameWidth, self.frameHeight):
+            return False
+        self.cancel()
+        self.frameWidth = int(width)
+        self.frameHeight = int(height)
+        self.createPool()
+        return True
+
+    def setIndex(self, index):
+        self.index = index
+
+    def setFrameCount(self, count):
+        if count <= 0 or self.metadata['frameCountExact'] and count == self.metadata['frameCount']:
+            return
+        self.metadata['frameCount'] = count
+        self.metadata['frameCountExact'] = True
+        self.frameCountChanged.emit(count)
+
+    def release(self, frame):
+        self.pool.release(frame)
+
+    def keyframeBefore(self, frame):
+        if self.index is None:
+            return None
+        return self.index.keyframe_before(frame)
+
+    def seekTime(self, frame):
+        # Half a frame early so rounding never lands on the following frame,
+        # accurate seek then drops everything decoded before the target
+        return max(0, (frame - 0.5) / self.metadata['fps'])
+
+    def setLookahead(self, frames=None):
+        # None decodes as fast as ffmpeg goes
+        with self.flow:
+            self.lookahead = frames
+            self.flow.notify_all()
+
+    def setPlayhead(self, frame):
+        with self.flow:
+            self.playhead = frame
+            self.flow.notify_all()
+
+    def isAhead(self, index):
+        return self.lookahead is not None and index - self.playhead > self.lookahead
+
+    def waitForPlayhead(self, index):
+        # Not reading the pipe stalls ffmpeg once the pipe is full, so the process idles too
+        self.flush()
+        with self.flow:
+            while self.isAhead(index) and not self.isInterruptionRequested():
+                self.flow.wait(0.1)
+        return not self.isInterruptionRequested()
+
+    def wake(self):
+        with self.flow:
+            self.flow.notify_all()
+
+    def close(self):
+        super().close()
+        # The index and the frame count scan the whole file, neither is of use any more
+        self.indexer.cancel()
+        if self.counter is not None:
+            self.counter.cancel()
+        if self.workers is not None:
+            self.workers.shutdown()
+            self.workers = None
+
+    def seek(self, frame):
+        # Restart decoding so the next emitted packet is frame
+        start = time.perf_counter()
+        self.cancel()
+        self.startFrame = max(0, min(int(frame), self.metadata['frameCount']-1))
+        self.setPlayhead(self.startFrame)
+        self.start()
+        self.lastRestart = (time.perf_counter() - start) * 1000
+
+    def inputArgs(self, startFrame=0):
+        inputArgs = (self.options.catchUp() if self.catchingUp else self.options).inputArgs()
+        if startFrame:
+            # Input side seek jumps to the keyframe before the target instead of decoding from zero.
+            # Catching up seeks exactly, cfr then starts on the target
+            inputArgs['ss'] = startFrame / self.metadata['fps'] if self.catchingUp else self.seekTime(startFrame)
+            inputArgs['accurate_seek'] = None
+        return inputArgs
+
+    def output(self, stream, frameCount=None, filename='pipe:'):
+        # Passthrough keeps ffmpeg from duplicating frames to fill the gap before a seek target.
+        # Catching up the skipped frames leave gaps that cfr fills with their neighbours, so packet
+        # indices still count frames
+        outputArgs = {'vsync' : 'cfr' if self.catchingUp else 'passthrough'}
+        if frameCount is not None:
+            outputArgs['frames:v'] = frameCount
+        if self.isScaled:
+            stream = stream.filter('scale', self.frameWidth, self.frameHeight, flags='bilinear')
+        return stream.output(
+            filename, 
+            format='rawvideo', 
+            pix_fmt='yuv420p' if self.usesYUV else self.currentFormat['rgb'],
+            **outputArgs
+        )
+
+    def graph(self, startFrame, frameCount=None):
+        return self.output(ffmpeg.input(self.file, **self.inputArgs(startFrame)), frameCount)
+
+    def decode(self, startFrame, frameCount=None, segment=0):
+        stream = self.supervisor.spawn(self.graph(startFrame, frameCount), pipe_stdout=True)
+        reader = PipeReader(stream.stdout)
+        if self.usesYUV:
+            self.readConverted(reader, startFrame, frameCount, segment)
+        else:
+            self.readFrames(reader, startFrame, frameCount, segment)
+        self.supervisor.reap(stream)
+
+    def run(self):
+        self.decodeStop = self.metadata['frameCount']
+        if self.segments > 1 and self.segmentLimit:
+            self.decodeStop = min(self.decodeStop, self.startFrame + self.segmentLimit)
+        if self.segments > 1:
+            self.decodeSegments()
+        else:
+            self.decode(self.startFrame)
+        self.flush()
+
+    def decodeSegments(self):
+        threads = []
+        stop = self.decodeStop
+        for segment, (start, end) in enumerate(self.segmentBounds(self.startFrame, stop)):
+            thread = threading.Thread(target=self.decode, args=(start, end - start, segment), daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+
+    def progress(self, segment, decoded, frameCount):
+        if frameCount is not None and (decoded % 10 == 0 or decoded == frameCount):
+            self.segmentProgress.emit(segment, decoded, frameCount)
+
+    def acquire(self, pool):
+        # Blocks until a buffer is free, None once interrupted
+        while not self.isInterruptionRequested():
+            buffer = pool.acquire(timeout=0.1)
+            if buffer is not None:
+                return buffer
+            # Every buffer is queued, make sure the consumer gets to them
+            self.flush()
+
+    def readFrames(self, reader, startFrame, frameCount=None, segment=0):
+        index = startFrame
+        while frameCount is None or index - startFrame < frameCount:
+            if frameCount is None and self.isAhead(index) and not self.waitForPlayhead(index):
+                break
+            frame = self.acquire(self.pool)
+            if frame is None:
+                break
+            if not reader.readinto(frame):
+                self.pool.release(frame)
+                break
+            if self.catchingUp:
+                self.catchUpFrames += 1
+            if self.isLate(index):
+                self.lateFrames += 1
+                self.pool.release(frame)
+            else:
+                self.deliver(index, frame)
+            index += 1
+            self.progress(segment, index - startFrame, frameCount)
+
+    def readConverted(self, reader, startFrame, frameCount=None, segment=0):
+        # Frames are converted concurrently and delivered in decode order
+        if self.workers is None:
+            self.workers = ThreadPoolExecutor(max_workers=self.workerCount)
+        pending = deque()
+        index = startFrame
+        while frameCount is None or index - startFrame < frameCount:
+            if frameCount is None and self.isAhead(index):
+                while pending:
+                    self.deliverConverted(*pending.popleft())
+                if not self.waitForPlayhead(index):
+                    break
+            source = self.acquire(self.yuvPool)
+            if source is None:
+                break
+            if not reader.readinto(source):
+                self.yuvPool.release(source)
+                break
+            if self.catchingUp:
+                self.catchUpFrames += 1
+            if self.isLate(index):
+                # Never converted
+                self.lateFrames += 1
+                self.yuvPool.release(source)
+                index += 1
+                continue
+            frame = self.acquire(self.pool)
+            if frame is None:
+                self.yuvPool.release(source)
+                break
+            job = self.workers.submit(self.converter.convert, source, self.frameWidth, self.frameHeight, frame)
+            pending.append((index, source, frame, job))
+            index += 1
+            if len(pending) >= self.workerCount:
+                self.deliverConverted(*pending.popleft())
+            self.progress(segment, index - startFrame - len(pending), frameCount)
+        while pending:
+            self.deliverConverted(*pending.popleft())
+        self.progress(segment, index - startFrame, frameCount)
+
+    def deliverConverted(self, index, source, frame, job):
+        job.result()
+        self.yuvPool.release(source)
+        if self.isInterruptionRequested():
+            self.pool.release(frame)
+        else:
+            self.deliver(index, frame)
 
 class AudioStream(Stream):
-    def __init__(self, file, parent=None) -> None:
-        super().__init__(file, codec="audio", parent=parent)
+    # Decoded audio goes into ring, a window of bufferSeconds around the listener that the decoder fills
+    # ahead of it. seek moves the reader and only restarts ffmpeg outside of that window
+    bufferSeconds = 5
+    # Of bufferSeconds, how much of what was played is kept for seeking back
+    seekBehind = 1
+    # How far past the decoder a seek still decodes through instead of restarting
+    seekAhead = 1
+    # How long a writer waits for the reader to make room in the ring before looking again
+    pollInterval = 0.05
+    # Seconds short of the probed duration that already count as the end, see isComplete
+    endTolerance = 0.25
+
+    def __init__(self, file, options=None, probe=None, parent=None) -> None:
+        super().__init__(file, codec="audio", options=options, probe=probe, parent=parent)
 
         self.audioFormat = {
             8  : {'np':np.int8, 'data':"u8"},
@@ -80,9 +471,9 @@ class AudioStream(Stream):
             print(self.info)
             channels = int(self.info['channels'])
             samplerate = int(self.info['sample_rate'])
-            duration = float(eval(self.info['duration']))
-            duration_ts = self.info['duration_ts']
-            frames = int(self.info['nb_frames'])
+            duration = streamDuration(self.info, self.probe) or 0
+            duration_ts = int(self.info.get('duration_ts') or round(duration * samplerate))
+            frames, _ = frameCount(self.info)
             audio_codec = self.info.get('codec_name')
             if (self.info.get('sample_fmt') == 'fltp' and audio_codec in ['mp3', 'mp4', 'aac', 'webm', 'ogg']):
                 bit = 16
@@ -99,28 +490,217 @@ class AudioStream(Stream):
                 "bit" : bit
             }
             self.currentFormat = self.audioFormat[bit]
+        self.ring = PCMRing(self.bufferSeconds * self.bytesPerSecond, self.frameBytes, self.seekBehind * self.bytesPerSecond) if self.info else None
+        # Bumped by every seek that restarts decoding, writers of an older generation stop writing
+        self.generation = 0
+        # Held by the one writer of the ring, the decoder thread or the audio side of an AVStream, and
+        # by a seek while it resets the ring
+        self.writing = threading.Lock()
+        # Set to wake a writer waiting for room
+        self.flow = threading.Event()
+        self.complete = False
+
+    @property
+    def frameBytes(self):
+        return np.dtype(self.currentFormat['np']).itemsize * self.metadata['channels']
+
+    @property
+    def bytesPerSecond(self):
+        return self.frameBytes * self.metadata['samplerate']
+
+    @property
+    def nextPacket(self):
+        # First packet the decoder has not written yet
+        return self.ring.writePos // self.packetSize
+
+    @property
+    def packetSize(self):
+        # Bytes per pipe read, whole samples for every channel so decoding can be resumed from any packet
+        frame = self.frameBytes
+        return self.metadata['samplerate'] * self.metadata['channels'] // frame * frame
+
+    @property
+    def packetDuration(self):
+        return self.packetSize / self.bytesPerSecond
+
+    def output(self, stream, filename='pipe:'):
+        return stream.output(
+            filename, 
+            format=self.currentFormat['data'], 
+            acodec=f"pcm_{self.currentFormat['data']}", 
+            ac=self.metadata['channels']
+        )
+
+    def graph(self, startPacket=0):
+        inputArgs = self.options.inputArgs()
+        if startPacket:
+            inputArgs['ss'] = startPacket * self.packetDuration
+        return self.output(ffmpeg.input(self.file, **inputArgs))
+
+    def wake(self):
+        self.flow.set()
+
+    def seek(self, position):
+        # Serve from byte position, True when decoding had to restart there. Called on the reader's side
+        # of the ring
+        position = position // self.frameBytes * self.frameBytes
+        if self.ring.seek(position, ahead=int(self.seekAhead * self.bytesPerSecond)):
+            return False
+        # Turns away the writer of a shared process too, which the lock then waits out
+        self.generation += 1
+        self.cancel()
+        with self.writing:
+            self.complete = False
+            packet = position // self.packetSize
+            self.ring.reset(position, packet * self.packetSize)
+            self.start()
+        return True
+
+    def resume(self, generation=None):
+        # Decode on in a process of its own, unless a seek since generation already restarted it
+        with self.writing:
+            if generation not in (None, self.generation) or self.complete or self.isRunning():
+                return
+            self.start()
+
+    def isComplete(self, position):
+        # Nothing left to play from byte position. ffmpeg only closes the audio pipe of a process shared
+        # with the video once the video is done too, until then the probed duration tells the end
+        if self.ring.isComplete():
+            return True
+        duration = self.metadata['duration']
+        return bool(duration) and not self.ring.readable() and position >= (duration - self.endTolerance) * self.bytesPerSecond
+
+    def readPackets(self, pipe, generation, interrupted=None, shared=False):
+        # Writes what the pipe has, at most a packet at a time, into the ring from nextPacket on and
+        # waits while it is full. True at the end of the pipe, which is only the true end of the audio
+        # when ffmpeg exits cleanly. False once cut off: interrupted, reset by a seek, or shared and a
+        # full window ahead
+        interrupted = interrupted or self.isInterruptionRequested
+        with self.writing:
+            while not interrupted():
+                packet = pipe.read1(self.packetSize)
+                if not packet:
+                    return True
+                if shared and self.ring.writable() < len(packet):
+                    # Waiting here would hold up the video of the same process
+                    return False
+                if not self.writePacket(packet, generation, interrupted):
+                    return False
+        return False
+
+    def writePacket(self, packet, generation, interrupted):
+        # Waits while the ring is full, not reading the pipe meanwhile stalls ffmpeg the way
+        # VideoStream.waitForPlayhead does. The reader never signals, the wait is a poll
+        view = memoryview(packet)
+        while len(view):
+            if interrupted() or generation != self.generation:
+                return False
+            count = self.ring.write(view)
+            view = view[count:]
+            if not count:
+                self.flow.wait(self.pollInterval)
+                self.flow.clear()
+        return True
+
+    def finish(self, generation):
+        with self.writing:
+            if generation == self.generation:
+                self.ring.finish()
+                self.complete = True
 
     def run(self):
-        packetSize = self.metadata['samplerate'] * self.metadata['channels']
-        stream = (
-            ffmpeg
-            .input(self.file)
-            .output(
-                'pipe:', 
-                format=self.currentFormat['data'], 
-                acodec=f"pcm_{self.currentFormat['data']}", 
-                ac=self.metadata['channels']
-            )
-            .run_async(pipe_stdout=True)
+        with self.writing:
+            generation = self.generation
+            # Starts from nextPacket, so a stream cut short picks up where it stopped
+            self.ring.rewind(self.nextPacket * self.packetSize)
+            graph = self.graph(self.nextPacket)
+        stream = self.supervisor.spawn(graph, pipe_stdout=True)
+        ended = self.readPackets(stream.stdout, generation)
+        if ended and not self.isInterruptionRequested() and stream.wait() == 0:
+            self.finish(generation)
+        self.supervisor.reap(stream)
+
+class AVStream(VideoStream):
+    # Video stream that also demuxes the audio of the file. While the audio has not been read yet and
+    # decoding runs sequentially from the start, one ffmpeg process writes video to stdout and audio to
+    # a second pipe. Anything else decodes video alone and the audio carries on in its own process
+    def __init__(self, file, bit=24, transport="rgb", options=None, probe=None, parent=None) -> None:
+        super().__init__(file, bit=bit, transport=transport, options=options, probe=probe, parent=parent)
+        # Fed by this stream while they share a process, see sharesAudio. Started on its own once that
+        # ends, or when a Speaker seeks it
+        self.audio = AudioStream(file, options=options, probe=self.probe, parent=self)
+        self.sharedProcesses = 0
+
+    def sharesAudio(self):
+        # Extra pipes are inherited through pass_fds, which Windows does not have
+        return (
+            self.audio.info is not None and os.name == "posix"
+            and self.startFrame == 0 and self.segments == 1
+            and self.audio.nextPacket == 0 and not self.audio.complete and not self.audio.isRunning()
         )
-        
-        while stream.poll() is None:
-            packet = stream.stdout.read(packetSize)
-            try:
-                frame = np.frombuffer(packet, dtype=self.currentFormat["np"])
-                self.packet.emit(frame)
-                stream.stdout.flush()
-            except:
+
+    def close(self):
+        super().close()
+        self.audio.close()
+
+    def wake(self):
+        super().wake()
+        self.audio.wake()
+
+    def resumeAudio(self, generation=None):
+        if self.audio.info is not None:
+            self.audio.resume(generation)
+
+    def run(self):
+        if not self.sharesAudio():
+            self.resumeAudio()
+            return super().run()
+        self.decodeStop = self.metadata['frameCount']
+        self.decodeShared()
+        self.flush()
+        if not self.audio.complete and not self.isInterruptionRequested():
+            self.resumeAudio()
+
+    def readAudio(self, pipe, generation, process):
+        # Audio side of decodeShared, on a thread of its own
+        ended = self.audio.readPackets(pipe, generation, self.isInterruptionRequested, shared=True)
+        if self.isInterruptionRequested():
+            return
+        if ended:
+            if process.wait() == 0:
+                self.audio.finish(generation)
+        else:
+            # Cut off by a seek or the full window, the audio carries on in its own process and the
+            # rest of the pipe is thrown away so the video keeps going
+            self.resumeAudio(generation)
+            while pipe.read(1 << 16):
                 pass
 
+    def decodeShared(self):
+        audioRead, audioWrite = os.pipe()
+        source = ffmpeg.input(self.file, **self.inputArgs(0))
+        graph = ffmpeg.merge_outputs(
+            self.output(source.video),
+            self.audio.output(source.audio, f"pipe:{audioWrite}"),
+        )
+        try:
+            stream = self.supervisor.spawn(graph, pipe_stdout=True, pass_fds=(audioWrite,))
+        finally:
+            os.close(audioWrite)
+        self.sharedProcesses += 1
+        audioPipe = os.fdopen(audioRead, "rb")
+        audioThread = threading.Thread(target=self.readAudio, args=(audioPipe, self.audio.generation, stream), daemon=True)
+        audioThread.start()
 
+        reader = PipeReader(stream.stdout)
+        if self.usesYUV:
+            self.readConverted(reader, 0)
+        else:
+            self.readFrames(reader, 0)
+        if self.isInterruptionRequested():
+            stream.kill()
+        # The audio pipe is closed at the end of the audio or when the process is killed
+        audioThread.join()
+        audioPipe.close()
+        self.supervisor.reap(stream)
@@ -0,0 +1,94 @@
+import atexit
+import subprocess
+import threading
+import time
+
+class Supervisor(object):
+    # Owns the ffmpeg processes of one stream. Every process started through a supervisor is also
+    # tracked globally so leaks show up in liveCount() and anything left is killed at exit
+    lock = threading.Lock()
+    everything = set()
+
+    def __init__(self):
+        self.processes = []
+        self.started = 0
+        self.reaped = 0
+        self.lastCancel = 0
+
+    def spawn(self, stream_spec, **kwargs):
+        return self.track(stream_spec.global_args('-nostdin').run_async(**kwargs))
+
+    def popen(self, args, interrupted=None, **kwargs):
+        # Any other command, such as the whole file ffprobe scans that take a popen. interrupted is checked
+        # once the process is tracked, so a kill() that came just before it started is not missed
+        process = self.track(subprocess.Popen(args, **kwargs))
+        if interrupted is not None and interrupted():
+            process.kill()
+        return process
+
+    def track(self, process):
+        with Supervisor.lock:
+            self.processes.append(process)
+            Supervisor.everything.add(process)
+            self.started += 1
+        return process
+
+    def reap(self, process):
+        # Kill if still running and wait so no zombie is left behind
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        for pipe in (process.stdin, process.stdout, process.stderr):
+            if pipe is not None:
+                pipe.close()
+        with Supervisor.lock:
+            if process in self.processes:
+                self.processes.remove(process)
+                self.reaped += 1
+            Supervisor.everything.discard(process)
+
+    def reapExited(self):
+        # Processes that ended on their own, e.g. through communicate() in a function they were passed to
+        with Supervisor.lock:
+            processes = [process for process in self.processes if process.poll() is not None]
+        for process in processes:
+            self.reap(process)
+
+    def kill(self):
+        # Only signals the processes, their readers see EOF and reap them
+        with Supervisor.lock:
+            processes = list(self.processes)
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+
+    def cancel(self):
+        start = time.perf_counter()
+        with Supervisor.lock:
+            processes = list(self.processes)
+        for process in processes:
+            self.reap(process)
+        self.lastCancel = (time.perf_counter() - start) * 1000
+
+    @property
+    def live(self):
+        with Supervisor.lock:
+            return sum(1 for process in self.processes if process.poll() is None)
+
+    @classmethod
+    def liveCount(cls):
+        with cls.lock:
+            return sum(1 for process in cls.everything if process.poll() is None)
+
+    @classmethod
+    def killAll(cls):
+        with cls.lock:
+            processes = list(cls.everything)
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+        with cls.lock:
+            cls.everything.clear()
+
+atexit.register(Supervisor.killAll)
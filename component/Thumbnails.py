@@ -0,0 +1,128 @@
+import math
+import os
+
+from PySide2.QtCore import QRect, QThread, Signal
+from PySide2.QtGui import QImage
+
+import ffmpeg
+from ffmpeg._utils import get_cache_dir
+from component.Supervisor import Supervisor
+
+class ThumbnailSheet(object):
+    # Sprite sheet of count thumbnails laid out in rows of columns, thumbnail i shows time i * interval
+    def __init__(self, path, count, columns, width, height, interval):
+        self.path = path
+        self.count = count
+        self.columns = columns
+        self.width = width
+        self.height = height
+        self.interval = interval
+        self.image = QImage(path)
+
+    def isNull(self):
+        return self.image.isNull()
+
+    def index(self, seconds):
+        return max(0, min(self.count - 1, int(round(seconds / self.interval))))
+
+    def rect(self, index):
+        row, column = divmod(index, self.columns)
+        return QRect(column * self.width, row * self.height, self.width, self.height)
+
+    def at(self, seconds):
+        return self.image.copy(self.rect(self.index(seconds)))
+
+class Thumbnails(QThread):
+    # Builds a ThumbnailSheet in one ffmpeg pass, separate from the decoder and its frame cache.
+    # When the packet index has a keyframe at least every interval only keyframes are decoded, each
+    # thumbnail is the keyframe nearest its time which is plenty for scrubbing. Longer GOPs would repeat
+    # a keyframe over several thumbnails, those files (and any keyframe pass that fails) are decoded in full
+    ready = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, file, duration, sourceWidth, sourceHeight, count=100, width=160, columns=10, parent=None) -> None:
+        super(Thumbnails, self).__init__(parent=parent)
+        self.file = file
+        self.duration = duration
+        self.count = max(1, int(count))
+        self.columns = min(columns, self.count)
+        self.rows = math.ceil(self.count / self.columns)
+        self.width = width
+        self.height = max(2, int(round(width * sourceHeight / sourceWidth / 2)) * 2)
+        self.interval = duration / self.count
+        self.supervisor = Supervisor()
+        self.sheet = None
+
+    def path(self):
+        name = '{}-{}x{}-{}.jpg'.format(ffmpeg.index_key(self.file), self.width, self.height, self.count)
+        return os.path.join(get_cache_dir('thumbnails'), name)
+
+    def keyframesSuffice(self):
+        # Longest gap between keyframes, the last one to the end included, against the thumbnail interval
+        try:
+            index = ffmpeg.packet_index(self.file, popen=self.popen)
+        except (ffmpeg.Error, OSError):
+            return False
+        finally:
+            self.supervisor.reapExited()
+        if not len(index.keyframes):
+            return False
+        times = [index.time(frame) for frame in index.keyframes] + [self.duration]
+        return max(b - a for a, b in zip(times, times[1:])) <= self.interval
+
+    def graph(self, path, keyframes=True):
+        inputArgs = {'skip_frame' : 'nokey'} if keyframes else {}
+        return (
+            ffmpeg
+            .input(self.file, **inputArgs)
+            .filter('fps', fps=self.count / self.duration)
+            .filter('scale', self.width, self.height)
+            .filter('tile', f"{self.columns}x{self.rows}")
+            .output(path, format='image2', vcodec='mjpeg', vsync='passthrough', **{'frames:v' : 1, 'q:v' : 5})
+            .overwrite_output()
+        )
+
+    def popen(self, args, **kwargs):
+        return self.supervisor.popen(args, interrupted=self.isInterruptionRequested, **kwargs)
+
+    def render(self, path, keyframes=True):
+        process = self.supervisor.spawn(self.graph(path, keyframes), pipe_stderr=True)
+        _, err = process.communicate()
+        self.supervisor.reap(process)
+        if process.returncode != 0 and os.path.isfile(path):
+            os.remove(path)
+        return err.decode('utf-8', 'replace')
+
+    def cancel(self):
+        self.requestInterruption()
+        self.supervisor.kill()
+        self.wait()
+        self.supervisor.cancel()
+
+    def run(self):
+        try:
+            path = self.path()
+        except OSError as e:
+            self.failed.emit(str(e))
+            return
+        if not os.path.isfile(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + '.tmp'
+            suffice = self.keyframesSuffice()
+            if self.isInterruptionRequested():
+                return
+            for keyframes in ((True, False) if suffice else (False,)):
+                err = self.render(tmp, keyframes)
+                if self.isInterruptionRequested():
+                    return
+                if os.path.isfile(tmp):
+                    break
+            else:
+                self.failed.emit(err)
+                return
+            os.replace(tmp, path)
+        self.sheet = ThumbnailSheet(path, self.count, self.columns, self.width, self.height, self.interval)
+        if self.sheet.isNull():
+            self.failed.emit(f"Could not read {path}")
+            return
+        self.ready.emit(self.sheet)
@@ -1,5 +1,6 @@
 from PySide2.QtCore import Property, QPoint, Qt
-from PySide2.QtWidgets import QApplication, QSlider, QStyleOptionSlider, QToolTip
+from PySide2.QtGui import QCursor, QPixmap
+from PySide2.QtWidgets import QApplication, QLabel, QSlider, QStyle, QStyleOptionSlider, QToolTip
 
 import os
 
@@ -16,7 +17,11 @@ class TooltipSlider(QSlider):
         self.resourcePath = os.path.normpath(os.path.join(fileDir, "icons")).replace("\\", "/")
 
         self.hover = False
+        # Cursor over the slider, the tip shows the value there rather than the handle's
+        self.hoverPos = None
         self.offset = offset
+        self.thumbnails = None
+        self.preview = None
         
         self.style = QApplication.style()
         self.opt = QStyleOptionSlider()
@@ -27,7 +32,8 @@ class TooltipSlider(QSlider):
         self.setOrientation(orientation)
         self.setSize(16)
         self.setStyleSheet(self.qss())
-        self.toolTipForm = 'f"{int(percentage / (1000*60*60)) % 24:02d}:{int(percentage / (1000*60)) % 60:02d}:{(percentage / (1000)) % 60:04.02f} ({self.value()})"'
+        self.setMouseTracking(True)
+        self.toolTipForm = 'f"{int(percentage / (1000*60*60)) % 24:02d}:{int(percentage / (1000*60)) % 60:02d}:{(percentage / (1000)) % 60:04.02f} ({value})"'
         
         self.valueChanged.connect(self.showTip)
 
@@ -36,6 +42,18 @@ class TooltipSlider(QSlider):
         
     def setTipVisibility(self, visible):
         self.tipVisible = visible
+        if not visible:
+            self.hidePreview()
+
+    def setThumbnails(self, sheet):
+        # ThumbnailSheet shown above the timecode while hovering, None for the timecode only
+        self.thumbnails = sheet
+        if sheet is None:
+            self.hidePreview()
+
+    def hidePreview(self):
+        if self.preview is not None:
+            self.preview.hide()
 
     def setSize(self, value):
         if self.orientation == Qt.Horizontal:
@@ -63,22 +81,71 @@ class TooltipSlider(QSlider):
     def enterEvent(self, event):
         super().enterEvent(event)
         self.hover = True
-        self.showTip(True)
+        self.hoverPos = self.mapFromGlobal(QCursor.pos())
+        self.showHovered()
 
     def leaveEvent(self, event) -> None:
         super().leaveEvent(event)
         self.hover = False
+        self.hoverPos = None
+        self.hidePreview()
+
+    def mouseMoveEvent(self, event):
+        super().mouseMoveEvent(event)
+        if self.hover:
+            self.hoverPos = event.pos()
+            self.showHovered()
+
+    def handleRect(self):
+        self.initStyleOption(self.opt)
+        return self.style.subControlRect(self.style.CC_Slider, self.opt, self.style.SC_SliderHandle, self)
+
+    def valueAt(self, pos):
+        # Value the handle would have centered on pos, laid out by the style like the handle is
+        handle = self.handleRect()
+        groove = self.style.subControlRect(self.style.CC_Slider, self.opt, self.style.SC_SliderGroove, self)
+        if self.orientation() == Qt.Horizontal:
+            length, start, end, at = handle.width(), groove.x(), groove.right(), pos.x() - handle.width() // 2
+        else:
+            length, start, end, at = handle.height(), groove.y(), groove.bottom(), pos.y() - handle.height() // 2
+        span = end - length + 1 - start
+        return QStyle.sliderValueFromPosition(self.minimum(), self.maximum(), at - start, span, self.opt.upsideDown)
+
+    def showHovered(self):
+        # Value under the cursor, the handle's own while it is dragged
+        if self.hoverPos is None or self.isSliderDown():
+            return self.showTip(self.value())
+        if self.isVisible() and self.tipVisible and self.hover:
+            handle = self.handleRect()
+            if self.orientation() == Qt.Horizontal:
+                handle.moveLeft(self.hoverPos.x() - handle.width() // 2)
+            else:
+                handle.moveTop(self.hoverPos.y() - handle.height() // 2)
+            self.showValue(self.valueAt(self.hoverPos), handle.topLeft())
 
     def showTip(self, _):
+        # The value changed, while hovering away from the handle the tip stays on the hovered value
+        if self.hoverPos is not None and not self.isSliderDown():
+            return
         if self.isVisible() and self.tipVisible and self.hover:
-            self.initStyleOption(self.opt)
-            rectHandle = self.style.subControlRect(self.style.CC_Slider, self.opt, self.style.SC_SliderHandle)
-
-            posLocal = rectHandle.topLeft() + self.offset
-            posGlobal = self.mapToGlobal(posLocal)
-            percentage = self.maxTime * (float(self.value()) / max(self.maximum(), 1))
-            tooltipFormat = eval(self.toolTipForm)
-            self.tip = QToolTip.showText(posGlobal, tooltipFormat, self)
+            self.showValue(self.value(), self.handleRect().topLeft())
+
+    def showValue(self, value, posLocal):
+        posGlobal = self.mapToGlobal(posLocal + self.offset)
+        percentage = self.maxTime * (float(value) / max(self.maximum(), 1))
+        tooltipFormat = eval(self.toolTipForm)
+        self.tip = QToolTip.showText(posGlobal, tooltipFormat, self)
+        if self.thumbnails is not None:
+            self.showPreview(posGlobal, percentage / 1000)
+
+    def showPreview(self, posGlobal, seconds):
+        # Nearest thumbnail in a tooltip window stacked on top of the timecode
+        if self.preview is None:
+            self.preview = QLabel(self, Qt.ToolTip)
+        self.preview.setPixmap(QPixmap.fromImage(self.thumbnails.at(seconds)))
+        self.preview.adjustSize()
+        self.preview.move(posGlobal.x(), posGlobal.y() - self.preview.height())
+        self.preview.show()
 
     def qss(self):
         return """
@@ -0,0 +1,76 @@
+import numpy as np
+
+# Kr, Kb luma coefficients per matrix
+MATRICES = {
+    "bt601" : (0.299, 0.114),
+    "bt709" : (0.2126, 0.0722),
+}
+
+# ffprobe color_space values and the matrix they use
+COLORSPACES = {
+    "bt709" : "bt709",
+    "bt470bg" : "bt601",
+    "smpte170m" : "bt601",
+    "fcc" : "bt601",
+    "smpte240m" : "bt709",
+}
+
+def colorMatrix(info):
+    # Probed color_space, or the usual HD/SD guess when the file does not say
+    matrix = COLORSPACES.get(info.get('color_space'))
+    if matrix:
+        return matrix
+    return "bt709" if int(info.get('height', 0)) >= 720 else "bt601"
+
+def frameSize(width, height):
+    return width * height * 3 // 2
+
+class YUVConverter(object):
+    # yuv420p to rgb24 through per component lookup tables. Chroma is looked up at quarter resolution,
+    # widened and added to both luma rows it covers, each channel is then clipped into the packed output
+    def __init__(self, matrix="bt709", fullRange=False):
+        self.matrix = matrix
+        self.fullRange = fullRange
+        kr, kb = MATRICES[matrix]
+        kg = 1 - kr - kb
+
+        values = np.arange(256, dtype=np.float64)
+        if fullRange:
+            luma = values
+            chroma = values - 128
+        else:
+            luma = (values - 16) * 255 / 219
+            chroma = (values - 128) * 255 / 224
+
+        self.lutY = np.round(luma).astype(np.int16)
+        self.lutRV = np.round(chroma * 2 * (1 - kr)).astype(np.int16)
+        self.lutBU = np.round(chroma * 2 * (1 - kb)).astype(np.int16)
+        # Green depends on both chroma planes, a 256x256 table keeps it a single lookup on u << 8 | v
+        gu = chroma * 2 * (1 - kb) * kb / kg
+        gv = chroma * 2 * (1 - kr) * kr / kg
+        self.lutG = np.round(-(gu[:, None] + gv[None, :])).astype(np.int16).ravel()
+
+    def convert(self, frame, width, height, out=None):
+        return self.convertRows(frame, width, height, out, 0, height)
+
+    def convertRows(self, frame, width, height, out=None, start=0, stop=None):
+        # Luma rows start:stop (even) of a packed frame, lets workers split one frame between them
+        if out is None:
+            out = np.empty((height, width, 3), dtype=np.uint8)
+        stop = height if stop is None else stop
+        size = width * height
+        quarter = size // 4
+        cw = width // 2
+        rows = (stop - start) // 2
+        y = frame[start * width:stop * width].reshape(rows, 2, width)
+        u = frame[size + start // 2 * cw:size + stop // 2 * cw].reshape(rows, cw)
+        v = frame[size + quarter + start // 2 * cw:size + quarter + stop // 2 * cw].reshape(rows, cw)
+
+        luma = np.take(self.lutY, y)
+        uv = (u.astype(np.uint16) << 8) | v
+        rgb = out[start:stop].reshape(rows, 2, width, 3)
+        work = np.empty(luma.shape, dtype=np.int16)
+        for channel, chroma in enumerate((np.take(self.lutRV, v), np.take(self.lutG, uv), np.take(self.lutBU, u))):
+            np.add(luma, np.repeat(chroma, 2, axis=1)[:, None, :], out=work)
+            np.clip(work, 0, 255, out=rgb[..., channel], casting="unsafe")
+        return out
@@ -11,12 +11,14 @@ os.environ['FFPROBE'] = os.path.normpath(os.path.join(FILEDIR, "bin","ffprobe.ex
 from . import nodes
 from . import _ffmpeg
 from . import _filters
+from . import _index
 from . import _probe
 from . import _run
 from . import _view
 from .nodes import *
 from ._ffmpeg import *
 from ._filters import *
+from ._index import *
 from ._probe import *
 from ._run import *
 from ._view import *
@@ -25,6 +27,7 @@ __all__ = (
     nodes.__all__
     + _ffmpeg.__all__
     + _probe.__all__
+    + _index.__all__
     + _run.__all__
     + _view.__all__
     + _filters.__all__
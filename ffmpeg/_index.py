@@ -0,0 +1,159 @@
+from fractions import Fraction
+from os import getenv
+import hashlib
+import os
+import subprocess
+
+import numpy as np
+
+from ._run import Error
+from ._utils import get_cache_dir
+
+
+def index_key(filename):
+    """Key identifying the current contents of ``filename`` (path, size and mtime)."""
+    path = os.path.abspath(filename)
+    stat = os.stat(path)
+    key = '{}|{}|{}'.format(path, stat.st_size, stat.st_mtime_ns)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+class PacketIndex(object):
+    """Packet timestamps, byte positions and keyframe flags of one stream.
+
+    Packets are stored in presentation order, so the position of a packet in
+    the arrays is its frame number.
+    """
+
+    def __init__(self, pts, pos, keyframe, time_base):
+        order = np.argsort(pts, kind='stable')
+        self.pts = np.asarray(pts, dtype=np.int64)[order]
+        self.pos = np.asarray(pos, dtype=np.int64)[order]
+        self.keyframe = np.asarray(keyframe, dtype=bool)[order]
+        self.time_base = Fraction(time_base)
+        self.keyframes = np.flatnonzero(self.keyframe)
+
+    def __len__(self):
+        return len(self.pts)
+
+    @property
+    def frame_count(self):
+        return len(self.pts)
+
+    def time(self, frame):
+        """Presentation time of ``frame`` in seconds, relative to the first packet."""
+        return float((int(self.pts[frame]) - int(self.pts[0])) * self.time_base)
+
+    def frame_at(self, seconds):
+        """Last frame presented at or before ``seconds``."""
+        target = int(seconds / self.time_base) + int(self.pts[0])
+        return max(0, int(np.searchsorted(self.pts, target, side='right')) - 1)
+
+    def keyframe_before(self, frame):
+        """Nearest keyframe at or before ``frame``, 0 when the stream has none."""
+        i = int(np.searchsorted(self.keyframes, frame, side='right')) - 1
+        if i < 0:
+            return 0
+        return int(self.keyframes[i])
+
+    def keyframe_after(self, frame):
+        """Nearest keyframe at or after ``frame``, None past the last keyframe."""
+        i = int(np.searchsorted(self.keyframes, frame, side='left'))
+        if i >= len(self.keyframes):
+            return None
+        return int(self.keyframes[i])
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez(
+                f,
+                pts=self.pts,
+                pos=self.pos,
+                keyframe=self.keyframe,
+                time_base=np.array(
+                    [self.time_base.numerator, self.time_base.denominator], dtype=np.int64
+                ),
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            num, den = data['time_base']
+            return cls(data['pts'], data['pos'], data['keyframe'], Fraction(int(num), int(den)))
+
+
+def _parse_packets(out):
+    pts = []
+    pos = []
+    keyframe = []
+    time_base = Fraction(1, 1)
+    for line in out.splitlines():
+        fields = line.split(b',')
+        if fields[0] == b'packet':
+            if fields[1] == b'N/A':
+                continue
+            pts.append(int(fields[1]))
+            pos.append(int(fields[2]) if fields[2] != b'N/A' else -1)
+            keyframe.append(fields[3].startswith(b'K'))
+        elif fields[0] == b'stream':
+            time_base = Fraction(fields[1].decode('ascii'))
+    return pts, pos, keyframe, time_base
+
+
+def probe_packets(filename, stream='v:0', cmd=getenv("FFPROBE", "ffprobe"), popen=subprocess.Popen):
+    """Run ffprobe over the packets of one stream and return a :class:`PacketIndex`.
+
+    Only packet pts, byte position and flags are requested, written as CSV,
+    which keeps the output a small fraction of the size of ``-show_packets``
+    JSON.
+
+    Args:
+        popen: callable that starts ffprobe, with the signature of
+            :class:`subprocess.Popen`; pass one that keeps the process to be
+            able to kill a scan of a long file.
+
+    Raises:
+        :class:`ffmpeg.Error`: if ffprobe returns a non-zero exit code.
+    """
+    args = [
+        cmd,
+        '-v', 'error',
+        '-select_streams', stream,
+        '-show_entries', 'packet=pts,pos,flags:stream=time_base',
+        '-of', 'csv',
+        filename,
+    ]
+    p = popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = p.communicate()
+    if p.returncode != 0:
+        raise Error('ffprobe', out, err)
+    return PacketIndex(*_parse_packets(out))
+
+
+def packet_index(filename, stream='v:0', cache_dir=None, cmd=getenv("FFPROBE", "ffprobe"), popen=subprocess.Popen):
+    """Return the :class:`PacketIndex` of ``filename``, reading it from disk when cached.
+
+    Indexes are stored under ``cache_dir`` (``$XDG_CACHE_HOME/ffmpyside/index``
+    by default) keyed by the absolute path, size and mtime of the file, so an
+    edited file is indexed again. ``popen`` is passed on to
+    :func:`probe_packets`.
+    """
+    cache_dir = cache_dir or get_cache_dir('index')
+    safe_stream = stream.replace(':', '_')
+    path = os.path.join(cache_dir, '{}-{}.npz'.format(index_key(filename), safe_stream))
+    if os.path.isfile(path):
+        try:
+            return PacketIndex.load(path)
+        except (OSError, ValueError, KeyError):
+            pass
+    index = probe_packets(filename, stream=stream, cmd=cmd, popen=popen)
+    index.save(path)
+    return index
+
+
+__all__ = ['index_key', 'packet_index', 'PacketIndex', 'probe_packets']
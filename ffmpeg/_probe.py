@@ -1,29 +1,194 @@
+from collections import OrderedDict
+import hashlib
 import json
+import os
 from os import getenv
 import subprocess
+import threading
 from ._run import Error
-from ._utils import convert_kwargs_to_cmd_line_args
+from ._utils import convert_kwargs_to_cmd_line_args, get_cache_dir
 
 
-def probe(filename, cmd=getenv("FFPROBE", "ffprobe"), **kwargs):
+class ProbeCache(object):
+    """Cache of :func:`probe` results.
+
+    Results are kept in an in-memory LRU of ``maxsize`` entries and, when
+    ``directory`` is given, as JSON files in that directory. Entries are keyed
+    by the absolute path, size and mtime of the file plus the ffprobe
+    arguments, so an edited file is probed again. Inputs that are not local
+    files (URLs, devices) are never cached.
+    """
+
+    def __init__(self, maxsize=128, directory=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def on_disk(cls, maxsize=128):
+        """A cache that also persists under ``$XDG_CACHE_HOME/ffmpyside/probe``."""
+        return cls(maxsize=maxsize, directory=get_cache_dir('probe'))
+
+    def key(self, filename, args):
+        try:
+            path = os.path.abspath(filename)
+            stat = os.stat(path)
+        except (OSError, TypeError, ValueError):
+            return None
+        key = '{}|{}|{}|{}'.format(path, stat.st_size, stat.st_mtime_ns, ' '.join(args))
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, '{}.json'.format(key))
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][1]
+        if self.directory:
+            try:
+                with open(self._path(key), 'r') as f:
+                    entry = json.load(f)
+                path, result = entry['path'], entry['result']
+            except (OSError, ValueError, KeyError, TypeError):
+                result = None
+            if result is not None:
+                self._remember(key, path, result)
+                with self._lock:
+                    self.hits += 1
+                return result
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, filename, result):
+        path = os.path.abspath(filename)
+        self._remember(key, path, result)
+        if self.directory:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                tmp = self._path(key) + '.tmp'
+                with open(tmp, 'w') as f:
+                    json.dump({'path': path, 'result': result}, f)
+                os.replace(tmp, self._path(key))
+            except OSError:
+                pass
+
+    def _remember(self, key, path, result):
+        with self._lock:
+            self._entries[key] = (path, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, filename=None):
+        """Forget the entries of ``filename``, or everything when it is None."""
+        path = None if filename is None else os.path.abspath(filename)
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                for key in [k for k, (p, _) in self._entries.items() if p == path]:
+                    del self._entries[key]
+        if not self.directory or not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            entry = os.path.join(self.directory, name)
+            if path is not None:
+                try:
+                    with open(entry, 'r') as f:
+                        if json.load(f).get('path') != path:
+                            continue
+                except (OSError, ValueError, AttributeError):
+                    pass
+            try:
+                os.remove(entry)
+            except OSError:
+                pass
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+def probe(filename, cmd=getenv("FFPROBE", "ffprobe"), cache=None, **kwargs):
     """Run ffprobe on the specified file and return a JSON representation of the output.
 
+    Args:
+        cache: optional :class:`ProbeCache`; repeated probes of an unchanged
+            file with the same arguments are answered from it.
+
     Raises:
         :class:`ffmpeg.Error`: if ffprobe returns a non-zero exit code,
             an :class:`Error` is returned with a generic error message.
             The stderr output can be retrieved by accessing the
             ``stderr`` property of the exception.
     """
-    print(cmd)
-    args = [cmd, '-show_format', '-show_streams', '-of', 'json']
+    args = ['-show_format', '-show_streams', '-of', 'json']
     args += convert_kwargs_to_cmd_line_args(kwargs)
-    args += [filename]
+    key = cache.key(filename, args) if cache is not None else None
+    if key is not None:
+        result = cache.get(key)
+        if result is not None:
+            return result
+
+    print(cmd)
+    p = subprocess.Popen([cmd] + args + [filename], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = p.communicate()
+    if p.returncode != 0:
+        raise Error('ffprobe', out, err)
+    result = json.loads(out.decode('utf-8'))
+    if key is not None:
+        cache.put(key, filename, result)
+    return result
+
 
-    p = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+def count_packets(filename, stream='v:0', cmd=getenv("FFPROBE", "ffprobe"), cache=None, popen=subprocess.Popen):
+    """Count the packets of one stream without decoding it.
+
+    This reads through the container with ``-count_packets``, which is much
+    cheaper than ``-count_frames`` and gives the frame count of video streams
+    whose container does not store one (MKV, WebM, MPEG-TS).
+
+    Args:
+        cache: optional :class:`ProbeCache` the count is kept in.
+        popen: callable that starts ffprobe, with the signature of
+            :class:`subprocess.Popen`; pass one that keeps the process to be
+            able to kill the count of a long file.
+
+    Raises:
+        :class:`ffmpeg.Error`: if ffprobe returns a non-zero exit code.
+    """
+    args = [
+        '-v', 'error',
+        '-select_streams', stream,
+        '-count_packets',
+        '-show_entries', 'stream=nb_read_packets',
+        '-of', 'csv=p=0',
+    ]
+    key = cache.key(filename, args) if cache is not None else None
+    if key is not None:
+        result = cache.get(key)
+        if result is not None:
+            return result['nb_read_packets']
+
+    p = popen([cmd] + args + [filename], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
     out, err = p.communicate()
     if p.returncode != 0:
         raise Error('ffprobe', out, err)
-    return json.loads(out.decode('utf-8'))
+    try:
+        count = int(out.split()[0])
+    except (IndexError, ValueError):
+        raise Error('ffprobe', out, err)
+    if key is not None:
+        cache.put(key, filename, {'nb_read_packets': count})
+    return count
 
 
-__all__ = ['probe']
+__all__ = ['count_packets', 'probe', 'ProbeCache']
@@ -199,6 +199,7 @@ def run_async(
     pipe_stderr=False,
     quiet=False,
     overwrite_output=False,
+    pass_fds=(),
 ):
     """Asynchronously invoke ffmpeg for the supplied node graph.
 
@@ -210,6 +211,8 @@ def run_async(
         pipe_stderr: if True, connect pipe to subprocess stderr.
         quiet: shorthand for setting ``capture_stdout`` and
             ``capture_stderr``.
+        pass_fds: extra file descriptors kept open in the subprocess, so
+            outputs can be written to ``pipe:<fd>`` (POSIX only).
         **kwargs: keyword-arguments passed to ``get_args()`` (e.g.
             ``overwrite_output=True``).
 
@@ -282,7 +285,11 @@ def run_async(
     stdout_stream = subprocess.PIPE if pipe_stdout or quiet else None
     stderr_stream = subprocess.PIPE if pipe_stderr or quiet else None
     return subprocess.Popen(
-        args, stdin=stdin_stream, stdout=stdout_stream, stderr=stderr_stream
+        args,
+        stdin=stdin_stream,
+        stdout=stdout_stream,
+        stderr=stderr_stream,
+        pass_fds=pass_fds,
     )
 
 
@@ -1,5 +1,6 @@
 from builtins import str
 import hashlib
+import os
 import sys
 
 if sys.version_info.major == 2:
@@ -93,3 +94,9 @@ def convert_kwargs_to_cmd_line_args(kwargs):
         if v is not None:
             args.append('{}'.format(v))
     return args
+
+
+def get_cache_dir(name):
+    """Directory for on-disk caches, ``$XDG_CACHE_HOME/ffmpyside/<name>``."""
+    base = os.getenv('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'ffmpyside', name)
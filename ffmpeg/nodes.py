@@ -1,5 +1,5 @@
 from .dag import KwargReprNode
-from ._utils import escape_chars, get_hash_int
+from ._utils import basestring, escape_chars, get_hash_int
 from builtins import object
 import os
 
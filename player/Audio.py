@@ -1,9 +1,13 @@
+import time
+
 from PySide2.QtWidgets import QHBoxLayout, QVBoxLayout, QWidget
-from PySide2.QtCore import QByteArray, Qt, Signal
-from PySide2.QtMultimedia import QAudioFormat, QAudioOutput
+from PySide2.QtCore import Qt, Signal
+from PySide2.QtMultimedia import QAudio, QAudioFormat
 
 from component.Stream import AudioStream
-from component.ElapsedTimer import ElapsedTimer
+from component.AudioDevice import AudioDevice
+from component.Opener import Opener
+from component.PlaybackClock import PlaybackClock
 from component.TooltipSlider import TooltipSlider
 from component.ButtonIcon import ButtonIcon
 
@@ -11,6 +15,11 @@ class Speaker(QWidget):
     timeChanged = Signal(float)
     durationChanged = Signal(float)
     stateChanged = Signal(str)
+    streamOpened = Signal(object)
+    # Message of a file that could not be opened, state is then "Error"
+    failed = Signal(str)
+    # Times the device ran dry while playing
+    underrunsChanged = Signal(int)
 
     def __init__(self, file, horizontal=True, parent=None):
         super(Speaker, self).__init__(parent=parent)
@@ -32,10 +41,17 @@ class Speaker(QWidget):
             
         self.mute = False
         self.memoryLimit = 0
+        self.opener = None
+        self.openOptions = None
+        self.frameCount = None
+        # Seconds of audio the device buffers ahead of the speakers
+        self.targetLatency = 0.2
+        self.volume = 1.0
+        self.underruns = 0
         self.setState("Idle")
 
-        self.timer = ElapsedTimer(self)
-        self.timer.timeout.connect(self.speak)
+        self.clock = None
+        self.setClock(PlaybackClock(self))
         if file:
             self.setStream(file)
 
@@ -43,11 +59,44 @@ class Speaker(QWidget):
         self.state = state
         self.stateChanged.emit(self.state)
 
-    def setStream(self, file, bit=24):
-        self.stream = AudioStream(file, parent=self)
-        self.stream.packet.connect(self.addToBuffer)
+    def setClock(self, clock):
+        # Share clock with a Viewer of the same file, seeks on it move the audio too
+        if self.clock is not None:
+            self.clock.timeChanged.disconnect(self.restartAt)
+        self.clock = clock
+        self.clock.timeChanged.connect(self.restartAt)
+
+    def setStream(self, file, bit=24, options=None):
+        # options is a DecoderOptions or a preset name such as "low latency".
+        # Returns right away, the file is probed on a worker and the stream created in openStream
+        self.closeStream()
+        self.clock.pause()
+        self.openOptions = options
+        self.opener = Opener(file, codec="audio", parent=self)
+        self.opener.finished.connect(self.opener.deleteLater)
+        self.opener.opened.connect(self.openStream)
+        self.opener.failed.connect(self.openFailed)
+        self.opener.start()
+        self.setState("Opening")
+
+    def openStream(self, opener):
+        if opener is not self.opener: return
+        self.opener = None
+        self.attachStream(AudioStream(opener.file, options=self.openOptions, probe=opener.probe, parent=self))
+
+    def attachStream(self, stream, start=True):
+        # Plays an AudioStream created elsewhere, such as the audio of a Viewer AVStream which feeds
+        # it from the video decoder process, in that case it is not started here
+        self.closeStream()
+        if stream.info is None:
+            # Such as the audio of a Viewer AVStream opened on a file without any
+            self.setState("Error")
+            self.failed.emit(f"No audio stream in {stream.file}")
+            return
+        self.stream = stream
         self.stream.finished.connect(self.finishedStreaming)
-        self.stream.start()
+        if start:
+            self.stream.start()
         self.setState("Buffering")
         
         audioFormat = QAudioFormat()
@@ -58,34 +107,51 @@ class Speaker(QWidget):
         audioFormat.setByteOrder(QAudioFormat.LittleEndian)
         audioFormat.setSampleType(QAudioFormat.SignedInt)
 
-        self.output = QAudioOutput(format=audioFormat)
-        self.output.setBufferSize(self.stream.metadata['samplerate'] * self.stream.metadata['channels'])
-        self.device = self.output.start()
-        self.data = []
-        self.buffer = QByteArray()
+        # Output and the source it pulls from the stream's ring, on the device's own thread
+        self.device = AudioDevice(audioFormat, self.stream)
+        self.device.stateChanged.connect(self.outputStateChanged)
+        self.device.finished.connect(self.finishedPlaying)
+        self.device.setVolume(self.volume)
+        self.source = self.device.source
+        # Media time the device started counting processedUSecs at
+        self.origin = 0
+        self.underruns = 0
 
         self.durationChanged.emit(self.stream.metadata['duration'])
+        self.streamOpened.emit(self.stream)
+
+    def openFailed(self, opener, message):
+        if opener is not self.opener: return
+        self.opener = None
+        self.setState("Error")
+        self.failed.emit(message)
 
-    def addToBuffer(self, stream):
-        self.data.append(stream)
-        self.buffer.append(QByteArray(stream.tobytes()))
+    def closeStream(self):
+        if self.opener is not None:
+            # Still probing, let it finish on its own and ignore the result
+            self.opener.requestInterruption()
+            self.opener = None
+        if not hasattr(self, "stream"): return
+        self.stream.finished.disconnect(self.finishedStreaming)
+        self.stream.close()
+        self.device.close()
+        if self.stream.parent() is self:
+            # Opened here rather than attached, dropping the reference alone would keep it until the speaker goes
+            self.stream.deleteLater()
+        del self.stream
+
+    def closeEvent(self, event):
+        self.pause()
+        self.closeStream()
+        super(Speaker, self).closeEvent(event)
 
     def finishedStreaming(self):
         if self.state == "Buffering":
             self.setState("Idle")
 
     def setFrameCount(self, frameCount):
-        # Split bits to framecount so there will be audio during seek
+        # Frames of the video scrubbed with seek
         self.frameCount = frameCount
-        
-        split = self.stream.metadata['totalbit']/self.frameCount
-        increment = max(1, int(split))
-        start = 0
-        self.bitPerFrame = []
-        while start < len(self.data):
-            end = int(start + increment)
-            self.bitPerFrame.append(QByteArray(self.data[start:end].tobytes()))
-            start = end
 
     def toggleMute(self):
         if not self.mute:
@@ -96,31 +162,113 @@ class Speaker(QWidget):
             self.unmute = self.volumeSlider.maximum()
         self.mute = not self.mute
 
-    def speak(self):
-        free = self.output.bytesFree()
-        if free > 0:
-            self.device.write(self.buffer)
-            self.buffer.remove(0, free)
-        if self.timer.elapsed.total_seconds() >= self.stream.metadata['duration']: self.stop()
+    def sampleBytes(self):
+        return self.source.sampleBytes
+
+    def setTargetLatency(self, seconds):
+        # Less is quicker to react to seeks and volume, more rides out longer stalls of the decoder
+        self.targetLatency = seconds
+        if hasattr(self, "stream"):
+            self.restartAt(self.clock.time())
+
+    def bytesPerSecond(self):
+        return self.stream.bytesPerSecond
+
+    def outputStateChanged(self, state, error):
+        if state == QAudio.IdleState and error == QAudio.UnderrunError and self.state == "Playing" and not self.source.isComplete():
+            self.underruns += 1
+            self.underrunsChanged.emit(self.underruns)
+
+    def audioStats(self):
+        if not hasattr(self, "stream"):
+            return {}
+        return {
+            "targetLatencyMs" : self.targetLatency * 1000,
+            "latencyMs" : self.latency() * 1000,
+            "bufferedMs" : self.stream.ring.readable() * 1000 / self.bytesPerSecond(),
+            "underruns" : self.underruns,
+            "starvedReads" : self.source.underruns,
+            "missingMs" : self.source.missingBytes * 1000 / self.bytesPerSecond(),
+        }
+
+    def latency(self):
+        # Seconds of audio pulled by the device but not heard yet
+        return self.device.status()[2] / self.bytesPerSecond()
+
+    def position(self):
+        # Media seconds coming out of the speakers, master for a Viewer's clock. None unless playing
+        if self.state != "Playing" or not hasattr(self, "stream"):
+            return None
+        state, processed, held, sampled = self.device.status()
+        if state not in (QAudio.ActiveState, QAudio.IdleState) or processed <= 0:
+            return None
+        held /= self.bytesPerSecond()
+        if state == QAudio.ActiveState:
+            # Played on since the snapshot, at most what the device held
+            played = min(held, (time.perf_counter_ns() - sampled) / 1e9)
+            held -= played
+        return self.origin + max(0, processed / 1e6 - held)
+
+    def setTime(self, seconds):
+        self.clock.setTime(seconds)
+
+    def restartAt(self, seconds, stop=None):
+        # Play from seconds, dropping whatever the device still holds. Paused it starts on start()
+        if not hasattr(self, "stream"): return
+        offset = self.source.align(seconds * self.bytesPerSecond())
+        self.origin = offset / self.bytesPerSecond()
+        self.device.stop()
+        self.source.setOffset(offset, None if stop is None else stop * self.bytesPerSecond())
+        if self.state == "Playing" or stop is not None:
+            self.startOutput()
+
+    def startOutput(self):
+        self.device.start(self.source.align(self.targetLatency * self.bytesPerSecond()) or self.sampleBytes())
 
     def start(self):
-        if not self.timer.isActive():
-            self.timer.start()
+        if self.state == "Playing": return
+        if hasattr(self, "stream"):
+            if self.device.state() == QAudio.SuspendedState:
+                self.device.resume()
+            else:
+                # Stopped or done with a scrub burst
+                self.restartAt(self.clock.time())
+                self.startOutput()
+        self.clock.start()
         self.setState("Playing")
         
     def stop(self):
-        if self.timer.isActive():
-            self.timer.stop()
+        self.clock.pause()
+        if hasattr(self, "stream"):
+            self.device.stop()
+        self.setState("Stopped")
+
+    def finishedPlaying(self):
+        # End of the audio. A clock shared with a Viewer is not the speaker's to pause, the video can run
+        # longer than the audio and carries on by itself
+        self.device.stop()
+        if self.clock.master == self.position:
+            self.clock.setMaster(None)
+        if self.clock.parent() is self:
+            self.clock.pause()
         self.setState("Stopped")
 
     def pause(self, event=None):
-        if self.timer.isActive():
-            self.timer.stop()
+        self.clock.pause()
+        # Holds processedUSecs too, so position() picks up where it paused
+        if hasattr(self, "stream"):
+            self.device.suspend()
         self.setState("Paused")
 
     def setVolume(self, vol):
-        self.output.setVolume(vol)
+        # Slider value, 0 to its maximum
+        self.volume = vol / self.volumeSlider.maximum()
+        if hasattr(self, "stream"):
+            self.device.setVolume(self.volume)
 
     def seek(self, frame):
-        if frame >= len(self.bitPerFrame): frame = len(self.bitPerFrame)-1
-        self.device.write(self.bitPerFrame[frame])
+        # Plays the audio under frame so there is sound while scrubbing
+        if not hasattr(self, "stream") or not self.frameCount: return
+        if self.state == "Playing": return
+        span = self.stream.metadata['duration'] / self.frameCount
+        self.restartAt(frame * span, stop=(frame + 1) * span)
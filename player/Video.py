@@ -1,8 +1,16 @@
-from PySide2.QtCore import Signal
+import time
+
+from PySide2.QtCore import Qt, QTimer, Signal
 from PySide2.QtGui import QImage, QPainter, QPixmap
 
-from component.Stream import VideoStream
-from component.ElapsedTimer import ElapsedTimer
+from component.Stream import AVStream, VideoStream
+from component.Opener import Opener
+from component.Thumbnails import Thumbnails
+from component.CompressedCache import CompressedCache
+from component.FrameCache import FrameCache
+from component.ImageQueue import ImageQueue
+from component.PlaybackClock import DeadlineTimer, PlaybackClock
+from component.FrameRenderer import FrameRenderer
 from component.FrameWidget import FrameWidget
 
 class Viewer(FrameWidget):
@@ -11,85 +19,659 @@ class Viewer(FrameWidget):
     stateChanged = Signal(str)
     ratioChanged = Signal(float)
     fpsChanged = Signal(float)
+    segmentProgress = Signal(int, int, int)
+    lookaheadChanged = Signal(int)
+    streamOpened = Signal(object)
+    firstFrameShown = Signal(float)
+    thumbnailsReady = Signal(object)
+    # Message of a file that could not be opened, state is then "Error"
+    failed = Signal(str)
+    # A/V offset and largest drift in milliseconds, dropped and held frames, see syncStats
+    syncChanged = Signal(float, float, int, int)
+    catchUpChanged = Signal(bool)
 
     def __init__(self, file=None, parent=None):
         super(Viewer, self).__init__(parent=parent)
         
         self.setAcceptDrops(True)
+        # paintEvent covers every pixel, Qt can skip erasing the styled background before each frame
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        self.setAttribute(Qt.WA_NoSystemBackground)
+        self.renderer = FrameRenderer()
+        self.image = None
 
-        self.memoryLimit = 0
-        self.buffer = []
+        self.memoryLimit = 2 * 1024**3
+        self.memoryUnit = "bytes"
+        self.diskDirectory = None
+        # (codec, memoryLimit, level) of the compressed tier under buffer, None to keep only buffer
+        self.compression = None
+        self.cold = None
+        self.prefetchSeconds = 1
+        # Upcoming frames are turned into QImages on a worker, see showFrame
+        self.convertAhead = True
+        self.images = ImageQueue(parent=self)
+        self.images.isCurrent = lambda frame, version: self.buffer is not None and self.buffer.version(frame) == version
+        self.images.isLate = self.isLate
+        # Stalls while playing switch the decoder to DecoderOptions.catchUp until it is catchUpLead seconds
+        # ahead again, frames decoded that way are in degraded
+        self.catchUp = True
+        self.catchUpLead = 1.0
+        self.degraded = set()
+        self.lateFrames = 0
+        self.resetPaintStats()
+        self.buffer = None
         self.frame = 0
+        self.pending = None
+        self.decodeHead = -1
+        self.seekAhead = 1
+        self.batching = (1, 0)
+        self.segments = 1
+        self.lookahead = (None, None)
+        self.depth = 0
+        self.resumeOnFrame = False
+        # State to go back to once a stall that does not resume playback has its frame
+        self.stalledState = "Idle"
+        self.fullResolution = False
+        self.transport = "rgb"
+        self.rescaleThreshold = 0.25
+        self.rescaleTimer = QTimer(self)
+        self.rescaleTimer.setSingleShot(True)
+        self.rescaleTimer.setInterval(250)
+        self.rescaleTimer.timeout.connect(self.applyDecodeSize)
+        self.opener = None
+        self.thumbnails = None
+        self.thumbnailCount = 100
+        self.openArgs = (24, None, False)
+        self.openStart = 0
+        # Milliseconds from setStream, "probe" once metadata is known and "firstFrame" once it is on screen
+        self.openTimes = {}
         self.setFrame(0)
         self.setState("Idle")
 
-        self.timer = ElapsedTimer(self)
-        self.timer.timeout.connect(self.draw)
+        self.clock = None
+        self.timer = None
+        self.audioMaster = None
+        # Frame the pending wakeup is for, a wakeup that finds an earlier one holds the current frame
+        self.dueFrame = None
+        self.resetSyncStats()
+        self.setClock(PlaybackClock(self))
         if file:
             self.setStream(file)
 
     def setState(self, state):
+        # Playing scales frames fast, anything else redraws the current one smoothly
+        redraw = self.image is not None and (state == "Playing") != (getattr(self, "state", None) == "Playing")
         self.state = state
         self.stateChanged.emit(self.state)
+        if redraw:
+            self.update(self.frameRect())
+
+    def setClock(self, clock):
+        # Share clock with another player of the same file, e.g. a Speaker's
+        if self.clock is not None:
+            self.clock.rateChanged.disconnect(self.reschedule)
+            self.clock.timeChanged.disconnect(self.reschedule)
+            self.timer.stop()
+            self.timer.deleteLater()
+        self.clock = clock
+        self.clock.rateChanged.connect(self.reschedule)
+        self.clock.timeChanged.connect(self.reschedule)
+        self.timer = DeadlineTimer(clock, self)
+        self.timer.timeout.connect(self.draw)
+        self.reschedule()
+
+    def setRate(self, rate):
+        # Playback speed, 1 is normal
+        self.clock.setRate(rate)
+
+    def reschedule(self):
+        # The pending wakeup was computed for the old time or rate
+        self.dueFrame = None
+        if self.state == "Playing":
+            self.timer.start(0)
+
+    def setAudioMaster(self, speaker=None):
+        # Slave the video clock to what speaker is playing: late frames are dropped, early ones held.
+        # speaker shares the clock from then on so seeks move both. None lets video run on its own
+        if self.audioMaster is not None:
+            self.clock.setMaster(None)
+            self.audioMaster = None
+        if speaker is None: return
+        speaker.setClock(self.clock)
+        self.clock.setMaster(speaker.position)
+        self.audioMaster = speaker
+
+    def setLatePolicy(self, catchUp=True, lead=1.0):
+        self.catchUp = catchUp
+        self.catchUpLead = lead
+        if not catchUp:
+            self.leaveCatchUp()
+
+    def isLate(self, frame):
+        # Display deadline already passed, called from the ImageQueue worker too
+        stream = getattr(self, "stream", None)
+        return self.state == "Playing" and stream is not None and self.clock.time() * stream.metadata['fps'] >= frame + 1
+
+    def enterCatchUp(self):
+        if self.catchUp and self.stream.setCatchUp(True):
+            self.catchUpChanged.emit(True)
+
+    def leaveCatchUp(self, restart=True):
+        # Back to full quality, the decoder carries on after what it already delivered
+        if not hasattr(self, "stream") or not self.stream.setCatchUp(False):
+            return
+        self.catchUpChanged.emit(False)
+        if restart and self.decodeHead + 1 < self.stream.metadata['frameCount']:
+            self.stream.seek(self.decodeHead + 1)
+
+    def lateStats(self):
+        # Frames skipped at each stage of the late frame policy:
+        #   catchUp : decoded with frames skipped and no deblocking
+        #   pipe    : read behind the playhead and given straight back, never converted or delivered
+        #   cache   : delivered behind the playhead, not stored
+        #   convert : past their deadline before the ImageQueue worker got to them
+        #   display : never shown, the clock was already past them
+        stats = self.stream.lateStats() if hasattr(self, "stream") else {"catchUp" : 0, "late" : 0}
+        return {
+            "catchUp" : stats["catchUp"],
+            "pipe" : stats["late"],
+            "cache" : self.lateFrames,
+            "convert" : self.images.late,
+            "display" : self.droppedFrames,
+        }
+
+    def syncStats(self):
+        return {
+            "offsetMs" : self.syncOffset * 1000,
+            "maxDriftMs" : self.maxDrift * 1000,
+            "dropped" : self.droppedFrames,
+            "held" : self.heldFrames,
+        }
+
+    def resetSyncStats(self):
+        self.syncOffset = self.maxDrift = 0
+        self.droppedFrames = self.heldFrames = 0
 
-    def setStream(self, file, bit=24):
-        self.stream = VideoStream(file, bit=bit, parent=self)
+    def setMemoryLimit(self, limit, unit="bytes"):
+        # limit is a byte budget, or a duration when unit is "seconds"
+        self.memoryLimit = limit
+        self.memoryUnit = unit
+        if hasattr(self, "stream"):
+            self.createBuffer()
+            self.requestFrame(self.frame)
+
+    def setDiskCache(self, directory=None, limit=None, unit="bytes"):
+        # Keep decoded frames in a memory mapped scratch file in directory, limit then is the size of that
+        # file and may be far above RAM. None goes back to frames in memory
+        self.diskDirectory = directory
+        if limit is not None:
+            self.setMemoryLimit(limit, unit)
+        elif hasattr(self, "stream"):
+            self.createBuffer()
+            self.requestFrame(self.frame)
+
+    def setCompressedCache(self, codec="zlib", limit=512 * 1024**2, level=1, prefetch=1):
+        # Frames evicted from buffer are kept compressed with codec ("zlib" or "png", None to disable) up to
+        # limit bytes, the next prefetch seconds are decompressed ahead of the playhead
+        self.compression = (codec, limit, level) if codec else None
+        self.prefetchSeconds = prefetch
+        if hasattr(self, "stream"):
+            self.createBuffer()
+            self.requestFrame(self.frame)
+
+    def closeCold(self):
+        if self.cold is None: return
+        self.cold.restored.disconnect(self.addRestored)
+        self.cold.close()
+        self.cold = None
+
+    def createCold(self):
+        self.closeCold()
+        if self.compression is None:
+            return
+        codec, limit, level = self.compression
+        self.cold = CompressedCache(self.buffer.shape, self.buffer.dtype, codec=codec, memoryLimit=limit, level=level, parent=self)
+        self.cold.setPlayhead(self.frame)
+        self.cold.restored.connect(self.addRestored)
+        self.buffer.onEvict = self.cold.store
+
+    def cacheStats(self):
+        # Per tier counters, "compressed" only when the compressed tier is enabled
+        stats = {"memory" : self.buffer.stats() if self.buffer is not None else {}}
+        if self.cold is not None:
+            stats["compressed"] = self.cold.stats()
+        return stats
+
+    def createBuffer(self):
+        if self.buffer is not None:
+            self.buffer.close()
+        self.buffer = FrameCache.fromLimit(
+            self.stream.frameShape, 
+            self.stream.metadata['fps'], 
+            dtype=self.stream.currentFormat['np'], 
+            memoryLimit=self.memoryLimit, 
+            unit=self.memoryUnit,
+            directory=self.diskDirectory
+        )
+        self.buffer.setPlayhead(self.frame)
+        self.images.clear()
+        self.createCold()
+        self.stream.setSegments(self.segments, limit=self.buffer.slotCount)
+        self.applyLookahead()
+
+    def setLookahead(self, frames=None, seconds=None):
+        # How far the decoder may run past the playhead, defaults to most of the frame cache
+        self.lookahead = (frames, seconds)
+        if hasattr(self, "stream"):
+            self.applyLookahead()
+
+    def applyLookahead(self):
+        frames, seconds = self.lookahead
+        if seconds is not None:
+            frames = int(seconds * self.stream.metadata['fps'])
+        if frames is None:
+            # Leave a quarter of the cache for frames behind the playhead
+            frames = self.buffer.slotCount * 3 // 4
+        self.stream.setLookahead(max(1, min(frames, self.buffer.slotCount - 1)))
+
+    def updateDepth(self):
+        depth = max(0, self.decodeHead - self.frame)
+        if depth != self.depth:
+            self.depth = depth
+            self.lookaheadChanged.emit(depth)
+
+    def setStream(self, file, bit=24, options=None, audio=False):
+        # options is a DecoderOptions or a preset name such as "low latency".
+        # audio also demuxes the audio track for a Speaker, reached through stream.audio once streamOpened fires.
+        # Returns right away, the file is probed on a worker and the stream created in openStream
+        self.closeStream()
+        self.timer.stop()
+        self.clock.pause()
+        self.resumeOnFrame = False
+        self.openArgs = (bit, options, audio)
+        self.openStart = time.perf_counter()
+        self.openTimes = {}
+        self.opener = Opener(file, codec="video", parent=self)
+        self.opener.finished.connect(self.opener.deleteLater)
+        self.opener.opened.connect(self.openStream)
+        self.opener.failed.connect(self.openFailed)
+        self.opener.start()
+        self.setState("Opening")
+
+    def openStream(self, opener):
+        if opener is not self.opener: return
+        self.opener = None
+        self.openTimes['probe'] = (time.perf_counter() - self.openStart) * 1000
+        bit, options, audio = self.openArgs
+        streamType = AVStream if audio else VideoStream
+        self.stream = streamType(opener.file, bit=bit, transport=self.transport, options=options, probe=opener.probe, parent=self)
         self.stream.packet.connect(self.addToBuffer)
+        self.stream.packetsReady.connect(self.drainBuffer)
         self.stream.finished.connect(self.finishedStreaming)
+        self.stream.segmentProgress.connect(self.segmentProgress)
+        self.stream.frameCountChanged.connect(self.updateFrameCount)
+        self.stream.setBatching(*self.batching)
+        self.setRatio(self.stream.metadata['width']/self.stream.metadata['height'])
+        self.stream.setOutputSize(*self.decodeSize())
+        self.createBuffer()
+        self.frame = 0
+        self.pending = 0
+        self.decodeHead = -1
+        self.clock.setTime(0)
+        self.resetSyncStats()
+        self.degraded.clear()
+        self.lateFrames = 0
         self.stream.start()
+        self.stalledState = "Idle"
         self.setState("Buffering")
 
-        self.setRatio(self.stream.metadata['width']/self.stream.metadata['height'])
         self.fpsChanged.emit(self.stream.metadata['fps'])
         self.frameCountChanged.emit(self.stream.metadata['frameCount']-1)
+        self.streamOpened.emit(self.stream)
+        self.createThumbnails()
+
+    def createThumbnails(self):
+        # Scrub sheet for a TooltipSlider, connect thumbnailsReady to its setThumbnails
+        metadata = self.stream.metadata
+        self.thumbnails = Thumbnails(self.stream.file, metadata['duration'], metadata['width'], metadata['height'], count=self.thumbnailCount, parent=self)
+        self.thumbnails.ready.connect(self.thumbnailsReady)
+        self.thumbnails.start()
 
-    def addToBuffer(self, stream):
-        self.buffer.append(stream)
+    def updateFrameCount(self, count):
+        # The stream counted the frames of a file whose container did not say
+        self.frameCountChanged.emit(count-1)
+
+    def openFailed(self, opener, message):
+        if opener is not self.opener: return
+        self.opener = None
+        self.setState("Error")
+        self.failed.emit(message)
+
+    def closeStream(self):
+        if self.opener is not None:
+            # Still probing, let it finish on its own and ignore the result
+            self.opener.requestInterruption()
+            self.opener = None
+        if self.thumbnails is not None:
+            self.thumbnails.ready.disconnect(self.thumbnailsReady)
+            self.thumbnails.cancel()
+            self.thumbnails.deleteLater()
+            self.thumbnails = None
+            self.thumbnailsReady.emit(None)
+        if not hasattr(self, "stream"): return
+        self.stream.packet.disconnect(self.addToBuffer)
+        self.stream.packetsReady.disconnect(self.drainBuffer)
+        self.stream.finished.disconnect(self.finishedStreaming)
+        self.stream.close()
+        self.stream.drain()
+        audio = getattr(self.stream, "audio", None)
+        if audio is not None:
+            # A Speaker may still hold the audio and closes it itself, it lives on without the stream
+            audio.setParent(None)
+        # Parented to the viewer, dropping the reference alone would keep it until the viewer goes
+        self.stream.deleteLater()
+        del self.stream
+        self.closeCold()
+        self.images.clear()
+        self.buffer.close()
+        self.buffer = None
+        self.image = None
+        self.renderer.clear()
+        self.update()
+
+    def closeEvent(self, event):
+        self.pause()
+        self.closeStream()
+        super(Viewer, self).closeEvent(event)
+
+    def setBatching(self, frames=1, interval=0):
+        self.batching = (frames, interval)
+        if hasattr(self, "stream"):
+            self.stream.setBatching(frames, interval)
+
+    def setTransport(self, transport="rgb"):
+        self.transport = transport
+        if hasattr(self, "stream") and self.stream.setTransport(transport):
+            self.requestFrame(self.frame)
+
+    def setSegments(self, count=1):
+        # Fill the frame cache from the playhead with count ffmpeg processes in parallel
+        self.segments = count
+        if hasattr(self, "stream"):
+            self.stream.setSegments(count, limit=self.buffer.slotCount)
+            self.requestFrame(self.frame)
+
+    def setFullResolution(self, enabled=True):
+        # Full resolution keeps source pixels for inspection, otherwise frames are decoded at display size
+        self.fullResolution = enabled
+        self.applyDecodeSize(force=True)
+
+    def decodeSize(self):
+        width = self.stream.metadata['width']
+        height = self.stream.metadata['height']
+        if self.fullResolution:
+            return width, height
+        dpr = self.devicePixelRatioF()
+        target = min(self.width() * dpr, self.height() * dpr * self.ratio)
+        if target >= width:
+            return width, height
+        target = max(16, int(target) // 2 * 2)
+        return target, max(2, int(round(target / self.ratio)) // 2 * 2)
+
+    def applyDecodeSize(self, force=False):
+        if not hasattr(self, "stream"): return
+        width, height = self.decodeSize()
+        current = self.stream.frameWidth
+        # Small changes either way keep the current decode and its cached frames, the paint path scales
+        # those cheaply. Only a change past rescaleThreshold restarts the decoder and empties the caches
+        if not force and current * (1 - self.rescaleThreshold) <= width <= current * (1 + self.rescaleThreshold):
+            return
+        if self.stream.setOutputSize(width, height):
+            self.createBuffer()
+            self.requestFrame(self.frame)
+
+    def resizeEvent(self, event):
+        super(Viewer, self).resizeEvent(event)
+        if hasattr(self, "stream"):
+            self.rescaleTimer.start()
+
+    def drainBuffer(self):
+        for index, frame in self.stream.drain():
+            self.addToBuffer(index, frame)
+
+    def addToBuffer(self, index, frame):
+        if frame.shape != self.buffer.shape:
+            # Decoded before the output size changed
+            self.stream.release(frame)
+            return
+        self.decodeHead = index
+        if self.state == "Playing" and index < self.frame:
+            # Too late to be shown
+            self.lateFrames += 1
+            self.stream.release(frame)
+            return
+        stored = self.buffer.put(index, frame)
+        self.stream.release(frame)
+        if self.stream.catchingUp:
+            self.degraded.add(index)
+        else:
+            self.degraded.discard(index)
+        self.updateDepth()
+        if self.stream.catchingUp and index - self.frame >= self.catchUpLead * self.stream.metadata['fps']:
+            self.leaveCatchUp()
+        if stored and index == self.pending:
+            self.showPending(index)
+
+    def addRestored(self, index, frame):
+        # Decompressed ahead of the playhead by the compressed tier
+        if self.buffer is None or frame.shape != self.buffer.shape or index in self.buffer:
+            return
+        if self.buffer.put(index, frame) and index == self.pending:
+            self.showPending(index)
+
+    def showPending(self, index):
+        self.pending = None
+        self.frame = index
+        self.showFrame(index)
+        if 'firstFrame' not in self.openTimes:
+            self.openTimes['firstFrame'] = (time.perf_counter() - self.openStart) * 1000
+            self.firstFrameShown.emit(self.openTimes['firstFrame'])
+        if self.resumeOnFrame:
+            self.resumeOnFrame = False
+            self.start()
+        elif self.state == "Buffering":
+            self.setState(self.stalledState)
 
     def finishedStreaming(self):
+        if self.stream.isRunning():
+            # A run cancelled by a seek, the next one is already decoding
+            return
         if self.state == "Buffering":
             self.setState("Idle")
 
+    def decodeReach(self, frame):
+        # How far past the decoder head it is still worth decoding through instead of restarting.
+        # With a keyframe index, a restart that would land on a keyframe already passed never pays off
+        keyframe = self.stream.keyframeBefore(frame)
+        if keyframe is not None:
+            return self.buffer.slotCount if keyframe <= self.decodeHead else 0
+        return min(self.buffer.slotCount, self.seekAhead * self.stream.metadata['fps'])
+
+    def requestFrame(self, frame):
+        # Evicted or not yet decoded, restart the decoder unless it is already heading there
+        self.pending = frame
+        if self.stream.isRunning() and self.stream.segments > 1:
+            # Segments arrive out of order, anything inside the range being decoded is on its way
+            if self.stream.startFrame <= frame < self.stream.decodeStop:
+                return
+        ahead = frame - self.decodeHead
+        if self.stream.isRunning() and 0 < ahead <= self.decodeReach(frame):
+            return
+        self.decodeHead = frame - 1
+        self.stream.seek(frame)
+
     def setFrame(self, frame):
-        if len(self.buffer) <= 0: return
+        # Seek, playback carries on from frame
+        if self.buffer is None: return
+        self.clock.setTime(frame / self.stream.metadata['fps'])
+        self.moveTo(frame)
+
+    def moveTo(self, frame):
         if frame == self.frame: return
-        if frame >= len(self.buffer): self.pause(); return
         if frame >= self.stream.metadata['frameCount']: frame = self.stream.metadata['frameCount']-1
+        self.buffer.setPlayhead(frame)
+        self.stream.setPlayhead(frame)
+        if self.cold is not None:
+            self.cold.setPlayhead(frame)
+            if frame not in self.buffer:
+                # A worker may trim it between a membership test and load
+                data = self.cold.load(frame)
+                if data is not None:
+                    self.buffer.put(frame, data)
+        if frame not in self.buffer:
+            self.stall()
+            self.requestFrame(frame)
+            return
         self.frame = frame
-        self.frameChanged.emit(self.frame)
-        image = QImage(self.buffer[self.frame], self.stream.metadata['width'], self.stream.metadata['height'], self.stream.currentFormat['qt'])
-        self.pixmap = QPixmap(image)
+        self.showFrame(frame)
+        self.updateDepth()
+        if self.cold is not None:
+            ahead = range(frame + 1, frame + 1 + int(self.prefetchSeconds * self.stream.metadata['fps']))
+            self.cold.prefetch(index for index in ahead if index not in self.buffer)
 
-        self.update()
+    def showFrame(self, frame):
+        self.frameChanged.emit(frame)
+        start = time.perf_counter()
+        data = self.buffer.get(frame)
+        image = self.images.take(frame) if self.convertAhead else None
+        if image is None:
+            # Not converted ahead, same conversion here. Scaled drawImage of rgb888 costs more than converting first
+            imageFormat = self.stream.currentFormat['qt']
+            image = QImage(data, data.shape[1], data.shape[0], data.strides[0], imageFormat)
+            if self.convertAhead:
+                image = image.convertToFormat(ImageQueue.TARGETS.get(imageFormat, QImage.Format_RGB32))
+            else:
+                image = QPixmap(image)
+        self.image = image
+        # Only the frame, the letterbox around it does not change
+        self.update(self.frameRect())
+        if self.convertAhead:
+            self.convertUpcoming(frame)
+        self.guiTime += time.perf_counter() - start
+        self.shownFrames += 1
+
+    def convertUpcoming(self, frame):
+        for index in range(frame + 1, frame + 1 + self.images.depth):
+            data = self.buffer.peek(index)
+            if data is not None:
+                self.images.request(index, self.buffer.version(index), data, self.stream.currentFormat['qt'])
+
+    def setConvertAhead(self, enabled=True):
+        # Off builds a QImage and a QPixmap on the GUI thread for every displayed frame
+        self.convertAhead = enabled
+        self.images.clear()
+
+    def paintStats(self):
+        # GUI thread milliseconds per displayed frame, spent in showFrame and paintEvent
+        stats = {
+            "frames" : self.shownFrames,
+            "guiMs" : (self.guiTime + self.paintTime) * 1000 / self.shownFrames if self.shownFrames else 0,
+            "showMs" : self.guiTime * 1000 / self.shownFrames if self.shownFrames else 0,
+            "paintMs" : self.paintTime * 1000 / self.paints if self.paints else 0,
+        }
+        stats.update(self.images.stats())
+        return stats
+
+    def resetPaintStats(self):
+        self.guiTime = self.paintTime = 0
+        self.shownFrames = self.paints = 0
 
     def draw(self):
-        secsElapsed = self.timer.elapsed.total_seconds()
-        percentage = secsElapsed/self.stream.metadata['duration']
-        frame = int(percentage * self.stream.metadata['frameCount'])
-        self.setFrame(frame)
-        if self.frame >= self.stream.metadata['frameCount'] or secsElapsed >= self.stream.metadata['duration']:
+        fps = self.stream.metadata['fps']
+        offset = self.clock.sync()
+        if offset is not None:
+            self.syncOffset = offset
+            self.maxDrift = max(self.maxDrift, abs(offset))
+        frame = int(self.clock.time() * fps)
+        if self.dueFrame is not None and frame < self.dueFrame:
+            # Early against the audio, keep the current frame up until the clock gets there
+            self.heldFrames += self.dueFrame - frame
+            frame = self.frame
+        elif frame > self.frame + 1 and self.dueFrame is not None:
+            # Late, the frames in between are never shown
+            self.droppedFrames += frame - self.frame - 1
+        self.moveTo(frame)
+        self.syncChanged.emit(self.syncOffset * 1000, self.maxDrift * 1000, self.droppedFrames, self.heldFrames)
+        # Past the last frame's display interval, the container duration can disagree with frameCount / fps
+        if frame >= self.stream.metadata['frameCount']:
             self.stop()
+        elif self.state == "Playing":
+            # Asleep until the next frame is due
+            self.dueFrame = frame + 1
+            self.timer.wakeAt(self.dueFrame / fps)
+
+    def frameRect(self):
+        return FrameRenderer.frameRect(self.size(), self.ratio)
 
     def paintEvent(self, event):
-        if hasattr(self, "pixmap"):
-            painter = QPainter()
-            painter.begin(self)
-            painter.drawPixmap(self.rect(), self.pixmap)
-            painter.end()
+        start = time.perf_counter()
+        painter = QPainter()
+        painter.begin(self)
+        self.renderer.paint(painter, event.region(), self.size(), self.ratio, self.image, self.devicePixelRatioF(), smooth=self.state != "Playing")
+        painter.end()
+        if self.image is not None:
+            self.paintTime += time.perf_counter() - start
+            self.paints += 1
         super(Viewer, self).paintEvent(event)
 
     def start(self):
-        if not self.timer.isActive():
-            self.timer.start()
+        if self.audioMaster is not None:
+            # Dropped when the audio ended
+            self.clock.setMaster(self.audioMaster.position)
+        self.clock.start()
+        if hasattr(self, "stream"):
+            self.stream.setDropLate(True)
         self.setState("Playing")
+        self.dueFrame = None
+        self.timer.start(0)
         
     def stop(self):
-        if self.timer.isActive():
-            self.timer.stop()
+        self.timer.stop()
+        self.clock.pause()
         self.setState("Stopped")
+        self.settle()
+
+    def stall(self):
+        # Playhead ran past the decoded frames, wait for the pending frame and carry on
+        if self.state == "Playing":
+            self.resumeOnFrame = True
+            if self.dueFrame is not None:
+                # Fell behind while playing, not a seek
+                self.enterCatchUp()
+        self.timer.stop()
+        self.clock.pause()
+        if self.state != "Buffering":
+            self.stalledState = self.state
+        self.setState("Buffering")
 
     def pause(self, event=None):
-        if self.timer.isActive():
-            self.timer.stop()
+        self.resumeOnFrame = False
+        self.timer.stop()
+        self.clock.pause()
         self.setState("Paused")
+        self.settle()
+
+    def settle(self):
+        # Stopped watching, frames decoded while catching up are decoded again at full quality
+        if not hasattr(self, "stream"): return
+        self.stream.setDropLate(False)
+        redo = self.frame in self.degraded
+        self.leaveCatchUp(restart=not redo)
+        for index in self.degraded:
+            self.buffer.discard(index)
+        self.degraded.clear()
+        if redo:
+            self.pending = self.frame
+            self.decodeHead = self.frame - 1
+            self.stream.seek(self.frame)
 